@@ -1,18 +1,22 @@
 # app.py
 import os
-import time
-from typing import Optional, List, Dict, Any
+from typing import Optional, List
 
-import requests
 import streamlit as st
 
+from metrics import start_exporter
+from tmdb_cache import freshness_policy
+from tmdb_client import get_client, get_health_probe
+
 # 페이지 기본 설정
 st.set_page_config(page_title="TMDB Regions Demo", page_icon="🎬", layout="centered")
 
 # TMDB 기본값
-TMDB_BASE = "https://api.themoviedb.org/3"
 DEFAULT_LANG = "ko-KR"
 
+# 연결 점검 패널을 다시 그리는 주기(초): 점검 자체는 백그라운드에서 tmdb_client 주기로만 실행
+HEALTH_PANEL_REFRESH_SEC = 5
+
 # ========================= ADI(API) 키(하드코드 기본값) =========================
 # 여기 값으로 앱 시작 시 자동 입력돼. 배포/공유 시엔 secrets 또는 환경변수 사용 추천.
 HARDCODED_TMDB_V3_KEY = "98eaf6d20dad569fcbf4dd59ab8cc47e"
@@ -48,6 +52,15 @@ def init_session_defaults():
 init_session_defaults()
 
 
+# === 지표 내보내기(MOODFLIX_METRICS_PORT가 있을 때만, 프로세스당 한 번) ===
+@st.cache_resource(show_spinner=False)
+def start_metrics_exporter() -> Optional[int]:
+    server = start_exporter()
+    return server.server_address[1] if server else None
+
+start_metrics_exporter()
+
+
 # === 키/토큰 읽기 ===
 def get_api_key() -> str:
     return (st.session_state.get("TMDB_API_KEY") or "").strip()
@@ -57,93 +70,29 @@ def get_access_token() -> str:
 
 
 # === 요청 헬퍼(안전판) ===
-def _is_json_response(r: requests.Response) -> bool:
-    ct = (r.headers.get("content-type") or "").lower()
-    return "application/json" in ct
-
-def _build_headers() -> Dict[str, str]:
-    headers = {
-        "accept": "application/json",
-        "User-Agent": "tmdb-client/1.0 (+streamlit)",
-    }
-    v4 = get_access_token()
-    if v4:
-        headers["Authorization"] = f"Bearer {v4}"
-    return headers
-
-def _attach_auth_params(params: Dict[str, Any]) -> Dict[str, Any]:
-    v4 = get_access_token()
-    v3 = get_api_key()
-    if v4:
-        return params  # v4 사용 시 api_key 추가 금지
-    if v3:
-        p = params.copy()
-        p["api_key"] = v3
-        return p
-    return params
-
 def tmdb_request(
     endpoint: str,
     params: Optional[dict] = None,
     lang: str = DEFAULT_LANG,
     timeout: int = 15,
     retries: int = 2,
-    backoff_sec: float = 0.6,
 ) -> dict:
     """
     TMDB API 호출(안전판).
-    - v4 토큰 있으면 헤더 인증, 없으면 v3 쿼리 인증
-    - 항상 text로 받은 후 JSON 여부 확인 후 파싱
-    - JSON 아님/빈 응답이면 {} 반환
-    - 429/5xx 재시도
+    - 실제 요청/인증/재시도는 공용 클라이언트(tmdb_client)가 처리
+    - 세션의 v3 키/v4 토큰을 넘기고, 경고/재시도 안내는 화면에 표시
     """
-    url = f"{TMDB_BASE}/{endpoint.lstrip('/')}"
-    params = (params or {}).copy()
-    if "language" not in params and lang:
-        params["language"] = lang
-
-    headers = _build_headers()
-    params = _attach_auth_params(params)
-
-    for attempt in range(retries + 1):
-        try:
-            r = requests.get(url, headers=headers, params=params, timeout=timeout)
-            raw = r.text or ""
-
-            if r.status_code in (429, 500, 502, 503, 504):
-                if attempt < retries:
-                    st.info(f"TMDB {r.status_code} 재시도 중... ({attempt+1}/{retries})")
-                    time.sleep(backoff_sec * (attempt + 1))
-                    continue
-
-            if not r.ok:
-                if r.status_code == 401:
-                    st.warning("TMDb 인증 실패(401). 키/토큰을 확인해줘.")
-                else:
-                    st.warning(f"TMDB {r.status_code} {r.reason} @ {endpoint} → {raw[:200]}")
-                return {}
-
-            if not raw.strip():
-                return {}
-
-            if not _is_json_response(r):
-                st.warning(f"JSON 아님 @ {endpoint} → {raw[:120]}")
-                return {}
-
-            try:
-                return r.json()
-            except ValueError:
-                st.warning(f"JSON 파싱 실패 @ {endpoint} → {raw[:120]}")
-                return {}
-
-        except requests.exceptions.RequestException as e:
-            if attempt < retries:
-                time.sleep(backoff_sec * (attempt + 1))
-                continue
-            st.warning(f"TMDB 요청 오류 @ {endpoint} → {e}")
-            return {}
-
-    return {}
+    return get_client().request(
+        endpoint,
+        params,
+        api_key=get_api_key(),
+        access_token=get_access_token(),
+        lang=lang,
+        timeout=timeout,
+        retries=retries,
+        on_error=st.warning,
+        on_retry=st.info,
+    )
 
 
 # === 캐시 무효화를 위한 인증 지문 ===
@@ -152,7 +101,7 @@ def auth_fingerprint() -> str:
 
 
 # === 기능 함수들 ===
-@st.cache_data(show_spinner=False, ttl=60 * 60)
+@st.cache_data(show_spinner=False, ttl=freshness_policy("regions").fresh_for)
 def get_provider_regions(_fp: str, lang: str = "en-US") -> List[str]:
     """
     시청 제공자 지역 코드 목록(ISO 3166-1).
@@ -165,9 +114,22 @@ def get_provider_regions(_fp: str, lang: str = "en-US") -> List[str]:
     codes = {x.get("iso_3166_1", "") for x in results if isinstance(x, dict) and x.get("iso_3166_1")}
     return sorted(codes)
 
-@st.cache_data(show_spinner=False, ttl=30 * 60)
-def tmdb_healthcheck_cached(_fp: str) -> dict:
-    return tmdb_request("configuration/countries", params={"language": "en-US"})
+@st.fragment(run_every=HEALTH_PANEL_REFRESH_SEC)
+def health_panel() -> None:
+    """연결 점검 결과 표시. 점검은 백그라운드에서 돌고 여기서는 마지막 결과만 읽음 (화면은 기다리지 않음)."""
+    status = get_health_probe().status(get_api_key(), get_access_token())
+    if status is None:
+        st.info("TMDB 연결 점검 중… (결과가 나오면 자동으로 표시돼)")
+    elif status.ok:
+        st.success(f"TMDB 연결 OK (configuration/countries) · {status.latency_ms:.0f}ms")
+        st.caption(f"응답 국가 수: {status.items if status.items is not None else 'N/A'}")
+    else:
+        latency = f" · {status.latency_ms:.0f}ms" if status.latency_ms is not None else ""
+        st.warning(f"TMDB 연결 불가 또는 빈 응답{latency}. 키/토큰/네트워크를 확인해줘.")
+        st.caption(status.detail)
+    open_circuits = get_client().open_circuits()
+    if open_circuits:
+        st.caption(f"요청 중단 중(회로 열림): {', '.join(open_circuits)} — 캐시된 값으로 응답하고 잠시 뒤 다시 시도해.")
 
 
 # === 사이드바 UI(앱 시작 시 자동으로 값 채워짐) ===
@@ -201,6 +163,7 @@ with st.sidebar:
             st.session_state["TMDB_ACCESS_TOKEN"] = (access_token_input or "").strip()
             st.session_state["APP_LANG"] = lang_input
             st.cache_data.clear()
+            get_health_probe().status(st.session_state["TMDB_API_KEY"], st.session_state["TMDB_ACCESS_TOKEN"], force=True)
             st.success("저장 완료. 아래 기능에 즉시 반영됐어.")
 
     with col_b:
@@ -215,12 +178,7 @@ st.title("🎬 TMDB Regions Demo")
 st.write("앱 켜면 네 ADI(API) 키가 자동으로 입력돼. 필요하면 사이드바에서 수정하고 저장하면 즉시 반영!")
 
 with st.expander("연결 상태 점검(Health Check)", expanded=True):
-    hc = tmdb_healthcheck_cached(auth_fingerprint())
-    if hc:
-        st.success("TMDB 연결 OK (configuration/countries)")
-        st.caption(f"응답 국가 수: {len(hc) if isinstance(hc, list) else 'N/A'}")
-    else:
-        st.warning("TMDB 연결 불가 또는 빈 응답. 키/토큰/네트워크를 확인해줘.")
+    health_panel()
 
 st.divider()
 
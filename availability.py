@@ -0,0 +1,121 @@
+# availability.py
+# - 작품별 "어느 지역에서 어떤 제공사가 어떤 방식으로 제공하는지"를 비트셋으로 압축한 인덱스.
+# - watch/providers 응답에는 모든 지역이 들어 있으므로 한 번 받으면 지역을 바꿔도 재요청 없이 조회 가능.
+# - 지역 코드마다 비트 위치를 하나 배정하고, (제공사, 시청 방식)별로 지역 비트를 OR로 모아 둠.
+
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from moods import NETFLIX_MONETIZATION_TYPES, NETFLIX_PROVIDER_ID
+
+TitleKey = Tuple[str, int]          # (kind, tmdb_id)
+OfferKey = Tuple[int, str]          # (provider_id, monetization)
+
+
+class AvailabilityIndex:
+    """(kind, id) → {(제공사, 시청 방식): 지역 비트셋} 인덱스. 여러 스레드/세션이 공유."""
+
+    def __init__(self, monetization_types: Sequence[str] = NETFLIX_MONETIZATION_TYPES):
+        self.monetization_types = tuple(monetization_types)
+        self._region_bits: Dict[str, int] = {}
+        self._regions: List[str] = []
+        self._titles: Dict[TitleKey, Tuple[float, Dict[OfferKey, int]]] = {}
+        self._lock = threading.Lock()
+
+    def _bit(self, region: str) -> int:
+        # 호출 전 self._lock을 잡고 있어야 함
+        pos = self._region_bits.get(region)
+        if pos is None:
+            pos = self._region_bits[region] = len(self._regions)
+            self._regions.append(region)
+        return 1 << pos
+
+    def add(self, kind: str, tmdb_id: int, provider_data: dict, replace: bool = True) -> None:
+        """watch/providers 응답(모든 지역)을 비트셋으로 변환해 저장. 빈 응답은 무시.
+        replace=False면 이미 기록된 작품은 건드리지 않음 (캐시의 옛 응답으로 기록 시각을 새로 찍지 않도록)."""
+        results = (provider_data or {}).get("results")
+        if results is None:
+            return
+        if not replace and (kind, tmdb_id) in self._titles:
+            return
+        offers: Dict[OfferKey, int] = {}
+        with self._lock:
+            for region, info in results.items():
+                bit = self._bit(region)
+                for monetization in self.monetization_types:
+                    for offer in info.get(monetization) or []:
+                        provider_id = offer.get("provider_id")
+                        if provider_id is not None:
+                            key = (provider_id, monetization)
+                            offers[key] = offers.get(key, 0) | bit
+            self._titles[(kind, tmdb_id)] = (time.time(), offers)
+
+    def _offers(self, kind: str, tmdb_id: int, max_age: Optional[float]) -> Optional[Dict[OfferKey, int]]:
+        entry = self._titles.get((kind, tmdb_id))
+        if entry is None:
+            return None
+        updated_at, offers = entry
+        if max_age is not None and time.time() - updated_at > max_age:
+            return None
+        return offers
+
+    def _mask(self, offers: Dict[OfferKey, int], provider_id: int, monetization: Sequence[str]) -> int:
+        mask = 0
+        for m in monetization:
+            mask |= offers.get((provider_id, m), 0)
+        return mask
+
+    def is_available(
+        self,
+        kind: str,
+        tmdb_id: int,
+        region: str,
+        provider_id: int = NETFLIX_PROVIDER_ID,
+        monetization: Sequence[str] = NETFLIX_MONETIZATION_TYPES,
+        max_age: Optional[float] = None,
+    ) -> Optional[bool]:
+        """region에서 제공되는지. 인덱스에 없거나 max_age보다 오래됐으면 None (모름)."""
+        offers = self._offers(kind, tmdb_id, max_age)
+        if offers is None:
+            return None
+        pos = self._region_bits.get(region)
+        if pos is None:
+            return False
+        return bool(self._mask(offers, provider_id, monetization) >> pos & 1)
+
+    def regions(
+        self,
+        kind: str,
+        tmdb_id: int,
+        provider_id: int = NETFLIX_PROVIDER_ID,
+        monetization: Sequence[str] = NETFLIX_MONETIZATION_TYPES,
+        max_age: Optional[float] = None,
+    ) -> Optional[List[str]]:
+        """제공되는 지역 코드 목록(정렬). 인덱스에 없으면 None."""
+        offers = self._offers(kind, tmdb_id, max_age)
+        if offers is None:
+            return None
+        mask = self._mask(offers, provider_id, monetization)
+        return sorted(r for r, pos in list(self._region_bits.items()) if mask >> pos & 1)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._titles.clear()
+
+    def __len__(self) -> int:
+        return len(self._titles)
+
+
+_index: Optional[AvailabilityIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_availability_index() -> AvailabilityIndex:
+    """프로세스 공용 인덱스."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = AvailabilityIndex()
+    return _index
@@ -0,0 +1,243 @@
+# bench.py
+# - 로컬 TMDB 대역 서버(fake_tmdb.py)를 띄워 놓고 추천 생성/카드 렌더링 경로의 성능을 재는 벤치마크.
+# - 실제 TMDB는 호출하지 않음 (TMDB_BASE_URL을 대역 서버로 바꾼 뒤 engine.py / test.py를 불러옴).
+# - 표준 무드 프로필마다 cold(캐시 비움) / warm(바로 다시) 두 번 재고,
+#   걸린 시간, TMDB 호출 수(대역 서버 기준), 공용 캐시 적중률, 최대 메모리(tracemalloc)를 보고.
+# - --baseline으로 이전 결과(JSON)와 비교해 허용치보다 느려지거나 호출이 늘면 종료 코드 1.
+#
+# 사용 예:
+#   python bench.py                                   # 지연 없는 대역 서버
+#   python bench.py --latency-ms 80 --jitter-ms 40 --error-rate 0.02
+#   python bench.py --json bench_output.json          # 결과 저장
+#   python bench.py --baseline bench_output.json      # 이전 결과 대비 회귀 검사
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, NamedTuple, Optional
+
+from ranking import CandidateStore
+
+if TYPE_CHECKING:
+    from fake_tmdb import FakeTMDB
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(HERE, "test.py")
+
+
+class BenchProfile(NamedTuple):
+    name: str
+    moods: List[str]
+    country: str = "KR"
+    include_movie: bool = True
+    include_tv: bool = True
+    allow_non_netflix: bool = False
+    pages: int = 3
+    server_filter: bool = True
+
+
+# 표준 무드 프로필: 기본 화면 / 단일 무드 / TV만 + 다른 지역 / 제공사 개별 확인(최악 경로)
+STANDARD_PROFILES = [
+    BenchProfile("default", ["행복", "호기심"]),
+    BenchProfile("single-mood", ["불안"]),
+    BenchProfile("tv-us", ["스트레스", "외로움"], country="US", include_movie=False),
+    BenchProfile("many-moods", ["우울", "분노", "설렘(로맨틱)", "위로/힐링"], pages=5),
+    BenchProfile("per-title-check", ["두려움(스릴)"], server_filter=False),
+]
+
+
+def configure_env(workdir: str, disk_cache: bool) -> None:
+    """tmdb_cache/posters/test.py가 import 시점에 읽는 환경변수 설정 (이 모듈들을 불러오기 전에 호출)."""
+    os.environ.setdefault("TMDB_API_KEY", "bench")
+    os.environ["TMDB_CACHE_PATH"] = os.path.join(workdir, "tmdb.sqlite3") if disk_cache else ""
+    os.environ["MOODFLIX_POSTER_CACHE"] = os.path.join(workdir, "posters")
+    os.environ["MOODFLIX_SNAPSHOT_PATH"] = os.path.join(workdir, "no-snapshot.sqlite3")
+    os.environ["MOODFLIX_WARM_REGIONS"] = ""
+    os.environ.setdefault("STREAMLIT_LOGGER_LEVEL", "error")
+
+
+def reset_caches() -> None:
+    """cold 측정용: 프로세스 메모리 캐시를 모두 비움 (디스크 캐시는 유지)."""
+    from availability import get_availability_index
+    from engine import get_result_cache
+    from tmdb_cache import get_shared_cache
+
+    get_shared_cache().clear()
+    get_availability_index().clear()
+    get_result_cache().clear()
+
+
+def _api_calls(stats: Dict[str, int]) -> int:
+    return sum(v for k, v in stats.items() if k.startswith("api."))
+
+
+def measure(server: "FakeTMDB", fn: Callable[[], Any], trace_memory: bool) -> Dict[str, Any]:
+    from tmdb_cache import get_shared_cache
+
+    cache = get_shared_cache()
+    before_cache = cache.stats()
+    server.reset_stats()
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    result = fn()
+    wall = time.perf_counter() - started
+    peak = 0
+    if trace_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    after_cache = cache.stats()
+    hits = (after_cache["hits"] + after_cache["stale_hits"]) - (before_cache["hits"] + before_cache["stale_hits"])
+    lookups = hits + after_cache["misses"] - before_cache["misses"]
+    stats = server.stats()
+    return {
+        "wall_ms": round(wall * 1000, 1),
+        "upstream_calls": _api_calls(stats),
+        "image_calls": stats.get("images", 0),
+        "injected_errors": stats.get("injected_5xx", 0) + stats.get("injected_429", 0),
+        "cache_hit_ratio": round(hits / lookups, 3) if lookups else None,
+        "peak_mem_mb": round(peak / 1024 / 1024, 2) if trace_memory else None,
+        "results": len(result) if isinstance(result, (list, CandidateStore)) else None,
+    }
+
+
+def bench_recommendations(server: "FakeTMDB", profile: BenchProfile, trace_memory: bool) -> Dict[str, Dict[str, Any]]:
+    from engine import build_recommendations
+
+    def run() -> CandidateStore:
+        return build_recommendations(
+            moods=profile.moods,
+            country=profile.country,
+            include_tv=profile.include_tv,
+            include_movie=profile.include_movie,
+            intensity={m: 3 for m in profile.moods},
+            allow_non_netflix=profile.allow_non_netflix,
+            pages=profile.pages,
+            server_filter=profile.server_filter,
+        )
+
+    reset_caches()
+    cold = measure(server, run, trace_memory=False)
+    warm = measure(server, run, trace_memory=False)
+    if trace_memory:
+        # tracemalloc은 느려지므로 시간과 따로 한 번 더 cold로 측정
+        reset_caches()
+        cold["peak_mem_mb"] = measure(server, run, trace_memory=True)["peak_mem_mb"]
+    return {"cold": cold, "warm": warm}
+
+
+def bench_render(server: "FakeTMDB", trace_memory: bool) -> Dict[str, Dict[str, Any]]:
+    """AppTest로 화면 전체를 실행: 첫 로드, "추천 보기" 클릭(추천 + 첫 페이지 카드), 다음 페이지."""
+    # 표 출력이 묻히지 않도록 Streamlit 경고 로그(폐기 예정 인자 등)는 끔
+    from streamlit import logger as st_logger
+    from streamlit.testing.v1 import AppTest
+
+    st_logger.set_log_level("error")
+    reset_caches()
+    at = AppTest.from_file(APP_PATH, default_timeout=120)
+    out = {}
+    out["load"] = measure(server, at.run, trace_memory)
+
+    def click_search():
+        at.button[0].click().run()
+        return at.session_state["last_results"]["recs"]
+
+    out["search"] = measure(server, click_search, trace_memory)
+
+    def next_page():
+        at.button(key="results_next").click().run()
+        return None
+
+    out["next_page"] = measure(server, next_page, trace_memory)
+    if at.exception:
+        raise RuntimeError(f"test.py 실행 중 예외: {at.exception}")
+    return out
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """기준 대비 회귀 목록: 시간이 (1+tolerance)배를 넘거나 TMDB 호출 수가 늘어난 항목."""
+    problems = []
+    for name, runs in results["scenarios"].items():
+        for phase, now in runs.items():
+            before = baseline.get("scenarios", {}).get(name, {}).get(phase)
+            if not before:
+                continue
+            if now["wall_ms"] > before["wall_ms"] * (1 + tolerance) and now["wall_ms"] - before["wall_ms"] > 5:
+                problems.append(f"{name}/{phase}: {before['wall_ms']}ms → {now['wall_ms']}ms")
+            if now["upstream_calls"] > before["upstream_calls"]:
+                problems.append(f"{name}/{phase}: TMDB 호출 {before['upstream_calls']} → {now['upstream_calls']}")
+    return problems
+
+
+def print_table(results: Dict[str, Any]) -> None:
+    header = f"{'scenario':<22}{'phase':<11}{'wall ms':>10}{'calls':>7}{'imgs':>6}{'errs':>6}{'hit%':>7}{'peak MB':>9}{'n':>5}"
+    print(header)
+    print("-" * len(header))
+    for name, runs in results["scenarios"].items():
+        for phase, r in runs.items():
+            hit = "-" if r["cache_hit_ratio"] is None else f"{r['cache_hit_ratio'] * 100:.0f}"
+            peak = "-" if r["peak_mem_mb"] is None else f"{r['peak_mem_mb']:.2f}"
+            n = "-" if r["results"] is None else str(r["results"])
+            print(f"{name:<22}{phase:<11}{r['wall_ms']:>10.1f}{r['upstream_calls']:>7}{r['image_calls']:>6}"
+                  f"{r['injected_errors']:>6}{hit:>7}{peak:>9}{n:>5}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="MoodFlix 벤치마크 (로컬 TMDB 대역 서버 사용)")
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--throttle-rate", type=float, default=0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--fixtures", help="fake_tmdb.py로 녹화한 응답 폴더 (재생)")
+    parser.add_argument("--disk-cache", action="store_true", help="디스크 캐시도 켜고 측정 (기본은 끔)")
+    parser.add_argument("--profiles", nargs="*", help="돌릴 프로필 이름 (기본: 전부)")
+    parser.add_argument("--no-render", action="store_true", help="AppTest 화면 렌더링 측정 건너뜀")
+    parser.add_argument("--no-memory", action="store_true", help="tracemalloc 최대 메모리 측정 건너뜀")
+    parser.add_argument("--json", help="결과를 JSON으로 저장할 경로")
+    parser.add_argument("--baseline", help="비교할 이전 결과 JSON")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="허용 시간 증가율 (기본 25%%)")
+    args = parser.parse_args(argv)
+
+    profiles = [p for p in STANDARD_PROFILES if not args.profiles or p.name in args.profiles]
+    with tempfile.TemporaryDirectory(prefix="moodflix-bench-") as workdir:
+        configure_env(workdir, args.disk_cache)
+        from fake_tmdb import FakeTMDB
+
+        server = FakeTMDB(
+            latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+            throttle_rate=args.throttle_rate, seed=args.seed, fixtures=args.fixtures,
+        ).start()
+        try:
+            os.environ["TMDB_BASE_URL"] = server.base_url
+            scenarios: Dict[str, Dict[str, Any]] = {}
+            for profile in profiles:
+                scenarios[profile.name] = bench_recommendations(server, profile, not args.no_memory)
+            if not args.no_render:
+                scenarios["render"] = bench_render(server, not args.no_memory)
+        finally:
+            server.stop()
+
+    results = {
+        "config": {k: v for k, v in vars(args).items() if k not in ("json", "baseline")},
+        "scenarios": scenarios,
+    }
+    print_table(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            problems = compare(results, json.load(f), args.tolerance)
+        for p in problems:
+            print(f"회귀: {p}")
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,946 @@
+# engine.py
+# - Streamlit 없이 쓰는 추천 엔진: 무드 → 장르 가중치 → discover 후보 → Netflix 제공 필터 → 랭킹.
+# - test.py(화면), 로컬 JSON HTTP 서버, JSONL 일괄 처리 CLI가 같은 코드와 같은 프로세스 캐시를 씀.
+# - 인증 정보/경고 출력/워커 스레드 초기화는 configure()로 바꿔 끼움 (기본: 환경변수 인증, 로그 경고).
+# - 돌려주는 추천 목록과 작품 dict는 캐시에 있는 것을 참조로 나눠 쓰므로 수정하지 말 것.
+#
+# 사용법:
+#   python engine.py serve --port 8765                     # POST /recommend {"profiles": [...]}
+#   python engine.py batch profiles.jsonl --out out.jsonl --workers 4
+
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from availability import get_availability_index
+from metrics import StageTimer, get_metrics
+from moods import MOOD_TO_GENRES, MOODS, NETFLIX_MONETIZATION_TYPES, NETFLIX_PROVIDER_ID
+from ranking import CandidateStore
+from snapshot import SNAPSHOT_PATH, SnapshotStore
+from tmdb_cache import MemoryCache, add_refresh_binder, freshness_policy, get_shared_cache, shared_cache
+from tmdb_client import get_client
+
+logger = logging.getLogger(__name__)
+
+# 제공사/discover 데이터 신선도(초): 이 데이터에 기대는 캐시는 모두 같은 기간 사용 (tmdb_cache 정책표 기준)
+PROVIDER_DATA_TTL = freshness_policy("providers").fresh_for
+
+# 제공사 확인 등 병렬 TMDB 요청의 동시 실행 상한 (환경변수로 기본값 조정 가능)
+MAX_CONCURRENT_REQUESTS = max(1, int(os.getenv("TMDB_MAX_CONCURRENCY", "8")))
+
+
+# -------------------------------------
+# 바꿔 끼우는 부분 (화면/서버별)
+# -------------------------------------
+
+class EngineHooks(NamedTuple):
+    credentials: Callable[[], Tuple[str, str]]              # (v3 api_key, v4 access_token)
+    on_error: Callable[[str], None]                         # TMDB 오류 안내
+    worker_initializer: Callable[[], Optional[Callable[[], None]]]  # 호출한 스레드에서 불러 워커 초기화 함수를 받음
+
+
+def _env_credentials() -> Tuple[str, str]:
+    return os.getenv("TMDB_API_KEY", ""), os.getenv("TMDB_ACCESS_TOKEN", "")
+
+
+_hooks = EngineHooks(credentials=_env_credentials, on_error=logger.warning, worker_initializer=lambda: None)
+
+
+def configure(**hooks: Any) -> None:
+    """EngineHooks 항목을 바꿈 (예: test.py는 세션 상태의 키와 st.warning을 넘김)."""
+    global _hooks
+    _hooks = _hooks._replace(**hooks)
+
+
+# shared_cache 백그라운드 갱신 스레드에서 쓸 인증 정보 (조회한 세션의 값을 붙잡아 둠)
+_bound_credentials: ContextVar[Optional[Tuple[str, str]]] = ContextVar("engine_bound_credentials", default=None)
+
+
+def _bind_credentials(load: Callable[[], Any]) -> Callable[[], Any]:
+    """갱신 스레드에는 세션 상태가 없어 credentials 훅이 기본값(환경변수)을 돌려주므로 지금 값을 붙잡음."""
+    credentials = _bound_credentials.get() or _hooks.credentials()
+
+    def run() -> Any:
+        token = _bound_credentials.set(credentials)
+        try:
+            return load()
+        finally:
+            _bound_credentials.reset(token)
+
+    return run
+
+
+add_refresh_binder(_bind_credentials)
+
+
+# -------------------------------------
+# 유틸: TMDB 요청
+# -------------------------------------
+
+def tmdb_request(endpoint: str, params: Optional[dict] = None) -> dict:
+    """TMDB API 호출 헬퍼 (공용 클라이언트로 커넥션 재사용, 오류 내성 포함)."""
+    bound = _bound_credentials.get()
+    api_key, access_token = bound or _hooks.credentials()
+    return get_client().request(
+        endpoint,
+        params,
+        api_key=api_key,
+        access_token=access_token,
+        # 백그라운드 갱신에는 알릴 화면이 없으므로 로그로
+        on_error=_hooks.on_error if bound is None else logger.warning,
+    )
+
+
+# -------------------------------------
+# TMDB 탐색/필터링
+# -------------------------------------
+
+# discover 결과와 작품 상세 묶음은 크고 세션마다 같으므로 st.cache_data(세션·재실행마다 복사) 대신
+# 공용 메모리 캐시에 한 벌만 두고 참조로 나눠 씀 (tmdb_cache.shared_cache). 돌려받은 값은 수정하지 말 것.
+# discover 결과는 원본 dict 대신 랭킹/카드 머리에 필요한 열만 담은 CandidateStore로 보관.
+@shared_cache("discover")
+def discover_titles(
+    kind: str,
+    with_genres: List[int],
+    page: int = 1,
+    language: str = "ko-KR",
+    watch_region: Optional[str] = None,
+    match_any: bool = False,
+) -> CandidateStore:
+    """영화/TV discover 결과 반환 (압축 열 저장소).
+
+    watch_region을 주면 해당 지역 Netflix 제공작만 TMDB 서버에서 걸러서 받음.
+    match_any=True면 장르를 OR(|)로 묶어 하나라도 해당하는 작품을 받음 (기본은 AND).
+    """
+    assert kind in ("movie", "tv")
+    endpoint = f"discover/{kind}"
+    params = {
+        "language": language,
+        "sort_by": "popularity.desc",
+        "include_adult": "false",
+        "page": page,
+    }
+    if with_genres:
+        params["with_genres"] = ("|" if match_any else ",").join(map(str, with_genres))
+    if watch_region:
+        params["with_watch_providers"] = NETFLIX_PROVIDER_ID
+        params["watch_region"] = watch_region
+        params["with_watch_monetization_types"] = "|".join(NETFLIX_MONETIZATION_TYPES)
+    data = tmdb_request(endpoint, params)
+    return CandidateStore.from_items(kind, data.get("results") or [])
+
+
+# 작품 한 편의 상세/출연진/영상/제공사를 한 번에 받는 append_to_response 키
+TITLE_BUNDLE_PARTS = ("credits", "videos", "watch/providers")
+
+
+# 제공사 정보가 들어 있으므로 신선도는 "providers" 정책 (작품 상세보다 옛 값을 짧게 씀)
+@shared_cache("providers")
+def get_title_bundle(kind: str, tmdb_id: int) -> dict:
+    """상세 + 출연진 + 영상(ko/en) + 시청 제공사를 요청 1번으로 받아 한 묶음으로 캐시.
+    실제로 받았을 때(갱신 포함)만 지역 인덱스에 기록 → 인덱스 기록 시각 = 받은 시각."""
+    bundle = tmdb_request(
+        f"{kind}/{tmdb_id}",
+        {
+            "language": "ko-KR",
+            "append_to_response": ",".join(TITLE_BUNDLE_PARTS),
+            "include_video_language": "ko,en",
+        },
+    )
+    # 모든 지역 정보가 들어 있으므로 지역 비트셋 인덱스에 기록 (지역 변경 시 재조회 불필요)
+    get_availability_index().add(kind, tmdb_id, bundle.get("watch/providers") or {})
+    return bundle
+
+
+def get_watch_providers(kind: str, tmdb_id: int) -> dict:
+    providers = get_title_bundle(kind, tmdb_id).get("watch/providers") or {}
+    # 인덱스가 비워졌을 때만 다시 채움. 기간이 지난 기록은 캐시의 옛 묶음으로 새로 찍지 않고,
+    # 옛 묶음을 돌려준 조회가 띄운 백그라운드 갱신이 끝나면 새 응답으로 바뀜
+    get_availability_index().add(kind, tmdb_id, providers, replace=False)
+    return providers
+
+
+def _worker_pool(max_workers: int) -> ThreadPoolExecutor:
+    """호출한 쪽이 정한 초기화(예: Streamlit 실행 컨텍스트 전달)를 물려받는 스레드 풀."""
+    return ThreadPoolExecutor(max_workers=max(1, max_workers), initializer=_hooks.worker_initializer())
+
+
+def fetch_watch_providers_concurrent(
+    titles: List[Tuple[str, int]],
+    max_workers: int = MAX_CONCURRENT_REQUESTS,
+) -> Dict[Tuple[str, int], dict]:
+    """(kind, id) 목록의 시청 제공사 정보를 병렬 조회 (캐시는 get_title_bundle 그대로 사용)."""
+    if not titles:
+        return {}
+
+    def fetch(title: Tuple[str, int]) -> Tuple[Tuple[str, int], dict]:
+        kind, tmdb_id = title
+        return title, get_watch_providers(kind, tmdb_id) or {}
+
+    with _worker_pool(min(max_workers, len(titles))) as pool:
+        return dict(pool.map(fetch, titles))
+
+
+def iter_title_bundles(
+    titles: List[Tuple[str, int]],
+    max_workers: int = MAX_CONCURRENT_REQUESTS,
+) -> Iterator[int]:
+    """(kind, id) 목록의 상세 묶음을 병렬로 받으며, 끝나는 순서대로 목록 위치(index)를 내보냄."""
+    if not titles:
+        return
+    with _worker_pool(min(max_workers, len(titles))) as pool:
+        futures = {pool.submit(get_title_bundle, kind, tmdb_id): i for i, (kind, tmdb_id) in enumerate(titles)}
+        for f in as_completed(futures):
+            yield futures[f]
+
+
+_snapshot: Optional[SnapshotStore] = None
+_snapshot_checked = False
+_snapshot_lock = threading.Lock()
+
+
+def get_snapshot() -> Optional[SnapshotStore]:
+    """오프라인 스냅샷 (snapshot.py ingest로 만든 파일이 없으면 None)."""
+    global _snapshot, _snapshot_checked
+    if not _snapshot_checked:
+        with _snapshot_lock:
+            if not _snapshot_checked:
+                if os.path.exists(SNAPSHOT_PATH):
+                    _snapshot = SnapshotStore(SNAPSHOT_PATH, readonly=True)
+                _snapshot_checked = True
+    return _snapshot
+
+
+# -------------------------------------
+# Netflix 제공 여부 확인
+# -------------------------------------
+
+def is_on_netflix(provider_data: dict, region: str) -> bool:
+    if not provider_data:
+        return False
+    results = provider_data.get("results", {})
+    if not results or region not in results:
+        return False
+    region_info = results.get(region, {})
+    for key in NETFLIX_MONETIZATION_TYPES:
+        offers = region_info.get(key) or []
+        for o in offers:
+            if o.get("provider_id") == NETFLIX_PROVIDER_ID:
+                return True
+    return False
+
+
+def netflix_available(kind: str, tmdb_id: int, region: str) -> bool:
+    """지역 비트셋 인덱스로 먼저 확인하고, 모를 때만 제공사 정보를 받아 판단."""
+    known = get_availability_index().is_available(kind, tmdb_id, region, max_age=PROVIDER_DATA_TTL)
+    if known is None:
+        return is_on_netflix(get_watch_providers(kind, tmdb_id), region)
+    return known
+
+
+def netflix_regions(kind: str, tmdb_id: int) -> List[str]:
+    """Netflix 제공 국가 목록 (이미 받은 제공사 정보만 사용, 없으면 받아서 인덱스에 기록)."""
+    index = get_availability_index()
+    regions = index.regions(kind, tmdb_id, max_age=PROVIDER_DATA_TTL)
+    if regions is None:
+        get_watch_providers(kind, tmdb_id)
+        regions = index.regions(kind, tmdb_id) or []
+    return regions
+
+
+# -------------------------------------
+# 추천 로직
+# -------------------------------------
+
+# 최종 추천 개수
+RESULT_SIZE = 18
+# 셔플로 매번 다른 조합이 나오도록 결과 수의 몇 배까지 후보를 모을지
+CANDIDATE_OVERSAMPLE = 2
+# discover 한 번에 OR로 묶을 장르 수 (1이면 장르마다 따로 요청)
+GENRE_QUERY_GROUP_SIZE = 4
+
+
+def interleave_top(ranked: List[CandidateStore], n: int) -> CandidateStore:
+    """종류별 점수순 저장소에서 번갈아 하나씩 꺼내 상위 n개 (한 종류가 모자라면 다른 종류로 채움)."""
+    picks: List[List[int]] = [[] for _ in ranked]
+    taken = 0
+    for i in range(max((len(r) for r in ranked), default=0)):
+        for r, pick in zip(ranked, picks):
+            if i < len(r) and taken < n:
+                pick.append(i)
+                taken += 1
+    return CandidateStore.concat([r.take(pick) for r, pick in zip(ranked, picks)])
+
+
+def rank_and_pick(candidates: CandidateStore, k: int = 12, genre_weight: Optional[Dict[int, int]] = None) -> CandidateStore:
+    """평점/인기도를 0~1로 정규화해 혼합 랭킹 후 상위 k개 선택 (ranking.py에서 벡터 연산).
+
+    genre_weight를 주면 무드 장르와 많이 겹치는 작품일수록 점수를 최대 2배까지 올려줌.
+    """
+    return candidates.ranked(k, genre_weight)
+
+
+def plan_genre_queries(genre_weight: Dict[int, int], group_size: int = GENRE_QUERY_GROUP_SIZE) -> List[List[int]]:
+    """가중치 순으로 장르를 group_size개씩 묶어 OR 조건 discover 쿼리 목록을 만듦."""
+    ordered = [gid for gid, _ in sorted(genre_weight.items(), key=lambda kv: kv[1], reverse=True)]
+    size = max(1, group_size)
+    return [ordered[i:i + size] for i in range(0, len(ordered), size)]
+
+
+def iter_discover_rounds(
+    kind: str,
+    genre_queries: List[List[int]],
+    pages: int,
+    watch_region: Optional[str] = None,
+) -> Iterator[CandidateStore]:
+    """페이지 깊이마다 모든 장르 쿼리를 한 바퀴씩 돌아 한 라운드 분량의 후보를 내보냄.
+
+    제너레이터라서 소비하는 쪽이 멈추면 그 이후 페이지는 요청하지 않음 (pages는 상한일 뿐).
+    """
+    for p in range(1, pages + 1):
+        batch = CandidateStore.concat([
+            discover_titles(kind, genres, page=p, watch_region=watch_region, match_any=True)
+            for genres in genre_queries
+        ])
+        if not len(batch):
+            return
+        yield batch
+
+
+def iter_snapshot_rounds(
+    snapshot: SnapshotStore,
+    kind: str,
+    genre_queries: List[List[int]],
+    pages: int,
+    watch_region: Optional[str] = None,
+) -> Iterator[CandidateStore]:
+    """iter_discover_rounds와 같은 모양으로 오프라인 스냅샷에서 후보를 꺼냄 (네트워크 없음)."""
+    page_size = 20
+    for p in range(pages):
+        batch = CandidateStore.concat([
+            CandidateStore.from_items(kind, snapshot.discover(kind, genres, region=watch_region, limit=page_size, offset=p * page_size))
+            for genres in genre_queries
+        ])
+        if not len(batch):
+            return
+        yield batch
+
+
+def iter_unique(rounds: Iterable[CandidateStore]) -> Iterator[CandidateStore]:
+    """라운드를 넘나들며 id 기준 중복 제거."""
+    seen = set()
+    for batch in rounds:
+        fresh = []
+        for i, tmdb_id in enumerate(batch.ids.tolist()):
+            if tmdb_id not in seen:
+                seen.add(tmdb_id)
+                fresh.append(i)
+        if fresh:
+            yield batch.take(fresh)
+
+
+def iter_split_by_netflix(
+    kind: str,
+    rounds: Iterable[CandidateStore],
+    country: str,
+    max_workers: int = MAX_CONCURRENT_REQUESTS,
+) -> Iterator[Tuple[CandidateStore, CandidateStore]]:
+    """라운드별로 (Netflix 제공, 그 외)로 나눔. 지역 인덱스에 없는 작품만 제공사를 병렬 조회."""
+    index = get_availability_index()
+    for batch in rounds:
+        ids = batch.ids.tolist()
+        unknown = [
+            (kind, tmdb_id) for tmdb_id in ids
+            if index.is_available(kind, tmdb_id, country, max_age=PROVIDER_DATA_TTL) is None
+        ]
+        fetch_watch_providers_concurrent(unknown, max_workers=max_workers)
+        on_nf: List[int] = []
+        others: List[int] = []
+        for i, tmdb_id in enumerate(ids):
+            (on_nf if netflix_available(kind, tmdb_id, country) else others).append(i)
+        yield batch.take(on_nf), batch.take(others)
+
+
+def build_recommendations(
+    moods: List[str],
+    country: str,
+    include_tv: bool,
+    include_movie: bool,
+    intensity: Dict[str, int],  # 각 무드 강도(1~5)
+    allow_non_netflix: bool,
+    pages: int = 3,
+    max_workers: int = MAX_CONCURRENT_REQUESTS,
+    server_filter: bool = True,
+    use_snapshot: bool = False,
+    on_progress: Optional[Callable[[CandidateStore], None]] = None,
+) -> CandidateStore:
+    """무드 조합으로 추천 목록 생성 ((kind, 작품 dict) 목록처럼 읽는 압축 저장소).
+
+    discover 페이지 → 중복 제거 → 제공사 필터 → 채택 순으로 필요한 만큼만 흘려보내고,
+    종류(영화/TV)별로 충분히 모이면 남은 페이지/장르는 요청하지 않음.
+    server_filter=True면 discover 단계에서 Netflix/지역 필터를 걸어 후보를 받으므로
+    작품별 제공사 조회가 필요 없음. False면 기존처럼 후보마다 제공사를 확인.
+    use_snapshot=True이고 스냅샷 파일이 있으면 후보/제공 여부를 모두 스냅샷에서 읽음.
+    on_progress를 주면 조건에 맞는 작품이 새로 모일 때마다 지금까지 모인 목록으로 호출.
+    단계별 시간(weighting / gather / provider_filter / rank)은 metrics의 recommendation_stage_seconds로 기록.
+    """
+    stages = StageTimer()
+    try:
+        with stages.stage("total"):
+            return _build_recommendations(
+                stages, moods, country, include_tv, include_movie, intensity, allow_non_netflix,
+                pages, max_workers, server_filter, use_snapshot, on_progress,
+            )
+    finally:
+        stages.publish(get_metrics())
+
+
+def _build_recommendations(
+    stages: StageTimer,
+    moods: List[str],
+    country: str,
+    include_tv: bool,
+    include_movie: bool,
+    intensity: Dict[str, int],
+    allow_non_netflix: bool,
+    pages: int,
+    max_workers: int,
+    server_filter: bool,
+    use_snapshot: bool,
+    on_progress: Optional[Callable[[CandidateStore], None]],
+) -> CandidateStore:
+    rng = random.Random(42)  # 스레드(예열 등)끼리 전역 난수 상태를 공유하지 않도록 지역 생성기 사용
+    snapshot = get_snapshot() if use_snapshot else None
+
+    # 요청한 모든 경우 조합 반영: 무드별 장르 집합을 합산(강도 가중치)하여 우선순위 부여
+    movie_genres_weight: Dict[int, int] = {}
+    tv_genres_weight: Dict[int, int] = {}
+
+    with stages.stage("weighting"):
+        for m in moods:
+            mapping = MOOD_TO_GENRES.get(m, {})
+            if include_movie:
+                for gid in mapping.get("movie", []):
+                    movie_genres_weight[gid] = movie_genres_weight.get(gid, 0) + max(1, intensity.get(m, 1))
+            if include_tv:
+                for gid in mapping.get("tv", []):
+                    tv_genres_weight[gid] = tv_genres_weight.get(gid, 0) + max(1, intensity.get(m, 1))
+
+    kinds = [(kind, weight) for kind, weight in (("movie", movie_genres_weight), ("tv", tv_genres_weight)) if weight]
+    if not kinds:
+        return CandidateStore.empty()
+    # 종류별로 이만큼 채택되면 탐색 중단 (결과 수보다 넉넉히 모아야 랭킹이 고를 여지가 생김)
+    quota = max(1, RESULT_SIZE * CANDIDATE_OVERSAMPLE // len(kinds))
+
+    def collect(watch_region: Optional[str], check_providers: bool) -> Tuple[List[CandidateStore], List[CandidateStore]]:
+        """종류별로 점수순 정렬한 (Netflix 제공, 그 외) 후보."""
+        accepted: List[CandidateStore] = []
+        rejected: List[CandidateStore] = []
+        for kind, genre_weight in kinds:
+            # 가중치가 높은 장르부터 OR로 묶어 discover 호출 → 결과는 genre_ids로 다시 가중 랭킹
+            queries = plan_genre_queries(genre_weight)
+            if snapshot is not None:
+                rounds = iter_unique(iter_snapshot_rounds(snapshot, kind, queries, pages, watch_region))
+            else:
+                rounds = iter_unique(iter_discover_rounds(kind, queries, pages, watch_region))
+            rounds = stages.iterate("gather", rounds)
+            if check_providers:
+                split = stages.iterate("provider_filter", iter_split_by_netflix(kind, rounds, country, max_workers=max_workers))
+            else:
+                split = ((batch, CandidateStore.empty()) for batch in rounds)
+            kind_ok: List[CandidateStore] = []
+            kind_rest: List[CandidateStore] = []
+            found = 0
+            for ok, rest in split:
+                kind_ok.append(ok)
+                kind_rest.append(rest)
+                found += len(ok)
+                if on_progress and len(ok):
+                    on_progress(CandidateStore.concat(accepted + kind_ok))
+                # 라운드 단위로 끊으므로 선택된 모든 장르가 고르게 섞임
+                if found >= quota:
+                    break
+            with stages.stage("rank"):
+                ok_pool = CandidateStore.concat(kind_ok)
+                rest_pool = CandidateStore.concat(kind_rest)
+                accepted.append(rank_and_pick(ok_pool, k=len(ok_pool), genre_weight=genre_weight))
+                rejected.append(rank_and_pick(rest_pool, k=len(rest_pool), genre_weight=genre_weight))
+        return accepted, rejected
+
+    if server_filter or snapshot is not None:
+        # 서버측(또는 스냅샷) 필터: 받은 후보가 이미 Netflix 제공작 → 제공사 개별 조회 생략
+        filtered, _ = collect(watch_region=country, check_providers=False)
+        if not any(len(r) for r in filtered) and allow_non_netflix:
+            filtered, _ = collect(watch_region=None, check_providers=False)  # 넷플릭스 없으면 대체로 채우기
+    else:
+        filtered, fallback = collect(watch_region=None, check_providers=True)
+        if not any(len(r) for r in filtered) and allow_non_netflix:
+            filtered = fallback  # 넷플릭스 없으면 대체로 채우기
+
+    # 종류별 점수 상위 RESULT_SIZE개만 고르고(후보의 절반 정도는 랭킹에서 탈락) 그 안에서만 순서를 섞음
+    picked = interleave_top(filtered, RESULT_SIZE)
+    order = list(range(len(picked)))
+    rng.shuffle(order)
+    return picked.take(order)
+
+
+# 최종 추천 결과 캐시에 보관할 프로필 수 (넘으면 오래 안 쓴 것부터 제거)
+RECOMMENDATION_CACHE_SIZE = 256
+
+# 무드를 하나도 고르지 않았을 때 쓰는 기본 추천 무드
+DEFAULT_MOODS = ("행복", "호기심")
+
+
+class RecommendationProfile(NamedTuple):
+    """추천 결과를 결정하는 입력만 정규화해 담은 캐시 키."""
+    moods: Tuple[Tuple[str, int], ...]  # (무드, 강도) - 무드 이름순
+    country: str
+    include_movie: bool
+    include_tv: bool
+    allow_non_netflix: bool
+    pages: int
+    server_filter: bool
+    use_snapshot: bool = False
+
+
+def recommendation_profile(
+    moods: List[str],
+    country: str,
+    include_tv: bool,
+    include_movie: bool,
+    intensity: Dict[str, int],
+    allow_non_netflix: bool,
+    pages: int = 3,
+    server_filter: bool = True,
+    use_snapshot: bool = False,
+) -> RecommendationProfile:
+    """선택 순서/중복과 무관하게 같은 입력이면 같은 프로필이 되도록 정규화."""
+    return RecommendationProfile(
+        moods=tuple((m, max(1, intensity.get(m, 1))) for m in sorted(set(moods))),
+        country=country,
+        include_movie=bool(include_movie),
+        include_tv=bool(include_tv),
+        allow_non_netflix=bool(allow_non_netflix),
+        pages=int(pages),
+        server_filter=bool(server_filter),
+        use_snapshot=bool(use_snapshot),
+    )
+
+
+_result_cache: Optional[MemoryCache] = None
+_result_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> MemoryCache:
+    """모든 세션/요청이 공유하는 최종 추천 결과 캐시 (LRU, 제공사 데이터와 같은 TTL)."""
+    global _result_cache
+    if _result_cache is None:
+        with _result_cache_lock:
+            if _result_cache is None:
+                _result_cache = MemoryCache(max_entries=RECOMMENDATION_CACHE_SIZE, ttl=PROVIDER_DATA_TTL)
+    return _result_cache
+
+
+def get_recommendations(
+    profile: RecommendationProfile,
+    max_workers: int = MAX_CONCURRENT_REQUESTS,
+    on_progress: Optional[Callable[[CandidateStore], None]] = None,
+) -> CandidateStore:
+    """프로필 단위로 최종 추천 목록을 캐시 (동시 요청 수·진행 콜백은 결과와 무관해 키에서 제외).
+
+    진행 콜백은 캐시에 맞지 않으므로(화면에 그리는 쪽) 결과 목록만 프로필 키로 보관.
+    작품 dict 대신 압축 열만 보관하고 카드용 dict는 꺼낼 때 만듦 (세션끼리 공유하므로 수정하지 말 것).
+    """
+    cache = get_result_cache()
+    recs = cache.get(profile)
+    get_metrics().inc("cache_lookups_total", cache="recommendations", result="miss" if recs is None else "hit")
+    if recs is not None:
+        return recs
+    recs = build_recommendations(
+        moods=[m for m, _ in profile.moods],
+        country=profile.country,
+        include_tv=profile.include_tv,
+        include_movie=profile.include_movie,
+        intensity=dict(profile.moods),
+        allow_non_netflix=profile.allow_non_netflix,
+        pages=profile.pages,
+        max_workers=max_workers,
+        server_filter=profile.server_filter,
+        use_snapshot=profile.use_snapshot,
+        on_progress=on_progress,
+    )
+    # 장애로 회로가 열려 있으면 결과가 빠졌을 수 있으므로 공유 캐시에 남기지 않음.
+    # 빈 결과도 남기지 않음: 키에 인증 정보가 없어 한 세션의 잘못된 키(401 등)가 모든 세션의 결과를 비우게 됨
+    if len(recs) and not get_client().open_circuits():
+        cache.put(profile, recs)
+    return recs
+
+
+# -------------------------------------
+# 캐시 예열 (백그라운드)
+# -------------------------------------
+
+# 예열할 지역 (예: "KR,US,JP"). 비워두면 예열하지 않음
+WARM_REGIONS = tuple(r.strip().upper() for r in os.getenv("MOODFLIX_WARM_REGIONS", "").split(",") if r.strip())
+# 예열 시 동시에 만드는 프로필 수
+WARM_CONCURRENCY = max(1, int(os.getenv("MOODFLIX_WARM_CONCURRENCY", "2")))
+
+# 단일 무드 외에 함께 예열할 자주 쓰는 무드 조합 (첫 번째는 무드 미선택 시 기본 추천)
+COMMON_MOOD_PAIRS = [
+    ("행복", "호기심"),
+    ("불안", "스트레스"),
+    ("우울", "외로움"),
+    ("스트레스", "무기력"),
+    ("우울", "위로/힐링"),
+    ("행복", "설렘(로맨틱)"),
+    ("호기심", "몰입/도전"),
+]
+
+
+class WarmerStatus:
+    """예열 진행 상황 (여러 세션이 같은 객체를 읽음)."""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def advance(self, ok: bool) -> None:
+        with self._lock:
+            self.done += 1
+            if not ok:
+                self.failed += 1
+            if self.done >= self.total:
+                self.finished_at = time.time()
+
+    @property
+    def running(self) -> bool:
+        return self.finished_at is None
+
+
+def warm_profiles(regions: Iterable[str]) -> List[RecommendationProfile]:
+    """지역별로 단일 무드 + 자주 쓰는 조합을 UI 기본 옵션(강도 3, 영화+TV)으로 만든 프로필 목록."""
+    combos = [(m,) for m in MOODS] + COMMON_MOOD_PAIRS
+    return [
+        recommendation_profile(
+            moods=list(combo),
+            country=region,
+            include_tv=True,
+            include_movie=True,
+            intensity={m: 3 for m in combo},
+            allow_non_netflix=False,
+        )
+        for region in regions
+        for combo in combos
+    ]
+
+
+def warm_caches(profiles: List[RecommendationProfile], status: WarmerStatus, concurrency: int = WARM_CONCURRENCY) -> None:
+    """프로필마다 추천 결과를 만들고 결과 카드의 상세 묶음까지 받아 캐시를 채움."""
+    def warm(profile: RecommendationProfile) -> None:
+        for kind, tmdb_id in get_recommendations(profile, max_workers=concurrency).keys():
+            get_title_bundle(kind, tmdb_id)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(warm, p) for p in profiles]
+        for f in as_completed(futures):
+            status.advance(f.exception() is None)
+
+
+# -------------------------------------
+# JSON 입출력 (HTTP 서버 / JSONL 일괄 처리)
+# -------------------------------------
+
+# 요청 한 번(HTTP 본문 / JSONL 한 줄 묶음)에 받는 프로필 수와 HTTP 본문 크기 상한
+MAX_BATCH_PROFILES = int(os.getenv("MOODFLIX_ENGINE_MAX_BATCH", "100"))
+MAX_BODY_BYTES = 1024 * 1024
+# 프로필 여러 개를 동시에 만드는 수 (프로필 하나 안의 제공사 조회 병렬도와는 별개)
+ENGINE_WORKERS = max(1, int(os.getenv("MOODFLIX_ENGINE_WORKERS", "4")))
+ENGINE_PORT = int(os.getenv("MOODFLIX_ENGINE_PORT", "8765"))
+
+# 결과 작품마다 내보내는 TMDB 필드 (후보 저장소가 보관하는 만큼만, 줄거리는 상세 묶음 쪽)
+ITEM_FIELDS = (
+    "id", "title", "name", "poster_path",
+    "release_date", "first_air_date", "vote_average", "vote_count", "popularity", "genre_ids",
+)
+
+
+# 프로필 JSON에서 받는 키 (오타를 조용히 무시하지 않도록 그 밖의 키는 오류)
+PROFILE_KEYS = {
+    "id", "request_id", "moods", "country", "include_movie", "include_tv",
+    "allow_non_netflix", "pages", "server_filter", "use_snapshot",
+}
+
+
+class InvalidLine(NamedTuple):
+    """JSONL에서 JSON으로 읽지 못한 줄 (결과에 오류로 남김)."""
+    line: int
+    error: str
+
+
+def _flag(data: Dict[str, Any], key: str, default: bool) -> bool:
+    """JSON true/false만 받음 (bool("false")가 참이 되는 문자열 등은 ValueError)."""
+    value = data.get(key, default)
+    if not isinstance(value, bool):
+        raise ValueError(f"{key}는 true/false여야 해요: {value!r}")
+    return value
+
+
+def profile_from_dict(data: Dict[str, Any]) -> RecommendationProfile:
+    """JSON 프로필 → RecommendationProfile. 잘못된 값이면 ValueError.
+
+    moods는 ["행복", ...](강도 3) 또는 {"행복": 4, ...}. 비어 있으면 기본 무드.
+    나머지 키(country, include_movie, include_tv, allow_non_netflix, pages, server_filter, use_snapshot)는 화면 기본값을 따름.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("프로필은 JSON 객체여야 해요.")
+    extra = sorted(set(data) - PROFILE_KEYS)
+    if extra:
+        raise ValueError(f"알 수 없는 키: {', '.join(extra)}")
+    raw = data.get("moods") or list(DEFAULT_MOODS)
+    if isinstance(raw, dict):
+        intensity = {str(m): v for m, v in raw.items()}
+    elif isinstance(raw, list):
+        intensity = {str(m): 3 for m in raw}
+    else:
+        raise ValueError("moods는 목록이나 {무드: 강도} 객체여야 해요.")
+    unknown = [m for m in intensity if m not in MOOD_TO_GENRES]
+    if unknown:
+        raise ValueError(f"알 수 없는 무드: {', '.join(unknown)} (가능: {', '.join(MOODS)})")
+    try:
+        intensity = {m: min(5, max(1, int(v))) for m, v in intensity.items()}
+        pages = int(data.get("pages", 3))
+    except (TypeError, ValueError):
+        raise ValueError("강도와 pages는 정수여야 해요.") from None
+    country = str(data.get("country", "KR")).upper()
+    if len(country) != 2 or not country.isalpha():
+        raise ValueError(f"country는 ISO 3166-1 두 글자 코드여야 해요: {country}")
+    include_movie = _flag(data, "include_movie", True)
+    include_tv = _flag(data, "include_tv", True)
+    if not (include_movie or include_tv):
+        raise ValueError("include_movie와 include_tv 중 하나는 켜야 해요.")
+    return recommendation_profile(
+        moods=list(intensity),
+        country=country,
+        include_tv=include_tv,
+        include_movie=include_movie,
+        intensity=intensity,
+        allow_non_netflix=_flag(data, "allow_non_netflix", False),
+        pages=min(10, max(1, pages)),
+        server_filter=_flag(data, "server_filter", True),
+        use_snapshot=_flag(data, "use_snapshot", False) and get_snapshot() is not None,
+    )
+
+
+def profile_to_dict(profile: RecommendationProfile) -> Dict[str, Any]:
+    out = profile._asdict()
+    out["moods"] = dict(profile.moods)
+    return out
+
+
+def item_to_dict(kind: str, item: dict) -> Dict[str, Any]:
+    """캐시에 있는 작품 dict에서 필요한 필드만 새 dict로 복사 (원본은 건드리지 않음)."""
+    out: Dict[str, Any] = {"kind": kind}
+    for key in ITEM_FIELDS:
+        if key in item:
+            out[key] = item[key]
+    return out
+
+
+def recommend(data: Any, max_workers: int = MAX_CONCURRENT_REQUESTS) -> Dict[str, Any]:
+    """JSON 프로필 하나 → {"id", "profile", "results", "elapsed_ms"} (실패하면 "error"). 예외를 던지지 않음."""
+    started = time.perf_counter()
+    out: Dict[str, Any] = {}
+    if isinstance(data, InvalidLine):
+        return {"id": f"line {data.line}", "error": f"JSON 아님: {data.error}", "elapsed_ms": 0.0}
+    if isinstance(data, dict):
+        ident = data.get("id", data.get("request_id"))
+        if ident is not None:
+            out["id"] = ident
+    try:
+        profile = profile_from_dict(data)
+        out["profile"] = profile_to_dict(profile)
+        out["results"] = [item_to_dict(kind, item) for kind, item in get_recommendations(profile, max_workers=max_workers)]
+    except ValueError as e:
+        out["error"] = str(e)
+    except Exception as e:
+        logger.exception("추천 생성 실패")
+        out["error"] = f"{type(e).__name__}: {e}"
+    out["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return out
+
+
+def iter_recommend(profiles: Iterable[Dict[str, Any]], workers: int = ENGINE_WORKERS) -> Iterator[Dict[str, Any]]:
+    """프로필을 workers개씩 병렬로 처리하며 입력 순서대로 결과를 내보냄.
+    앞서 나가 있는 작업은 workers의 2배까지만 두므로 입력이 아무리 길어도 메모리가 일정함."""
+    inner = max(1, MAX_CONCURRENT_REQUESTS // max(1, workers))
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="engine") as pool:
+        pending: Deque[Future] = deque()
+        for data in profiles:
+            pending.append(pool.submit(recommend, data, inner))
+            if len(pending) >= 2 * max(1, workers):
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def run_batch(src: Iterable[str], dst, workers: int = ENGINE_WORKERS) -> Tuple[int, int]:
+    """JSONL 프로필(한 줄에 하나) → JSONL 결과. 빈 줄은 건너뛰고, JSON이 아닌 줄은 error로 남김.
+    (처리한 수, 실패한 수)를 반환."""
+    def parse(lines: Iterable[str]) -> Iterator[Any]:
+        for n, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                yield InvalidLine(n, str(e))
+
+    done = failed = 0
+    for result in iter_recommend(parse(src), workers):
+        done += 1
+        failed += "error" in result
+        dst.write(json.dumps(result, ensure_ascii=False) + "\n")
+    return done, failed
+
+
+def make_server(host: str = "127.0.0.1", port: int = ENGINE_PORT, workers: int = ENGINE_WORKERS) -> ThreadingHTTPServer:
+    """로컬 JSON HTTP 서버 (serve_forever는 호출한 쪽에서).
+
+    POST /recommend  본문: 프로필 하나, 프로필 목록, 또는 {"profiles": [...]} → {"results": [...]}
+    GET  /healthz    회로 차단기 상태와 캐시 통계
+    GET  /metrics    Prometheus 텍스트 (metrics.py)
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, status: int, payload: Any, ctype: str = "application/json") -> None:
+            body = payload.encode("utf-8") if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", ctype + ("; charset=utf-8" if ctype.startswith("text/") else ""))
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            path = self.path.split("?")[0]
+            if path == "/healthz":
+                client = get_client()
+                self._send(200, {
+                    "ok": not client.open_circuits(),
+                    "circuits": client.circuits(),
+                    "client": client.stats(),
+                    "shared_cache": get_shared_cache().stats(),
+                    "result_cache": len(get_result_cache()),
+                })
+            elif path == "/metrics":
+                self._send(200, get_metrics().to_prometheus(), "text/plain; version=0.0.4")
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path.split("?")[0] != "/recommend":
+                self._send(404, {"error": "not found"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+            except ValueError:
+                length = -1
+            if length < 0:
+                self._send(400, {"error": "Content-Length는 0 이상의 정수여야 해요."})
+                return
+            if length > MAX_BODY_BYTES:
+                self._send(413, {"error": f"본문이 너무 커요 (최대 {MAX_BODY_BYTES}바이트)"})
+                return
+            try:
+                body = json.loads(self.rfile.read(length) or b"null")
+            except ValueError as e:
+                self._send(400, {"error": f"JSON 아님: {e}"})
+                return
+            single = isinstance(body, dict) and "profiles" not in body
+            profiles = [body] if single else body.get("profiles") if isinstance(body, dict) else body
+            if not isinstance(profiles, list) or not profiles:
+                self._send(400, {"error": "프로필 객체, 프로필 목록, 또는 {\"profiles\": [...]}를 보내주세요."})
+                return
+            if len(profiles) > MAX_BATCH_PROFILES:
+                self._send(413, {"error": f"프로필은 한 번에 {MAX_BATCH_PROFILES}개까지예요."})
+                return
+            results = list(iter_recommend(profiles, min(workers, len(profiles))))
+            self._send(200, results[0] if single else {"results": results})
+
+        def log_message(self, format, *args):
+            logger.debug("%s - %s", self.address_string(), format % args)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except Exception:
+        pass
+
+    parser = argparse.ArgumentParser(description="MoodFlix 추천 엔진 (JSON HTTP 서버 / JSONL 일괄 처리)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="로컬 JSON HTTP 서버")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=ENGINE_PORT)
+    serve.add_argument("--workers", type=int, default=ENGINE_WORKERS, help="요청 하나 안에서 동시에 만드는 프로필 수")
+    serve.add_argument("--warm", action="store_true", help="MOODFLIX_WARM_REGIONS 지역의 자주 쓰는 프로필을 미리 만들어 둠")
+    batch = sub.add_parser("batch", help="JSONL 프로필 파일 → JSONL 결과")
+    batch.add_argument("input", help="프로필 JSONL 경로 (- 이면 표준 입력)")
+    batch.add_argument("--out", default="-", help="결과 JSONL 경로 (기본: 표준 출력)")
+    batch.add_argument("--workers", type=int, default=ENGINE_WORKERS, help="동시에 만드는 프로필 수")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    if not any(_hooks.credentials()):
+        raise SystemExit("TMDB_API_KEY(또는 TMDB_ACCESS_TOKEN) 환경변수가 필요해요.")
+
+    if args.command == "serve":
+        if args.warm and WARM_REGIONS:
+            profiles = warm_profiles(WARM_REGIONS)
+            threading.Thread(target=warm_caches, args=(profiles, WarmerStatus(len(profiles))), name="engine-warmer", daemon=True).start()
+        server = make_server(args.host, args.port, args.workers)
+        logger.info("추천 엔진 대기 중: http://%s:%d/recommend", *server.server_address[:2])
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        return 0
+
+    src = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    dst = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8")
+    try:
+        started = time.perf_counter()
+        done, failed = run_batch(src, dst, args.workers)
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if dst is not sys.stdout:
+            dst.close()
+    logger.info("완료: %d개 프로필 (실패 %d) · %.1f초", done, failed, time.perf_counter() - started)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
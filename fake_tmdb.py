@@ -0,0 +1,399 @@
+# fake_tmdb.py
+# - 벤치마크/부하 테스트용 로컬 TMDB 대역(stand-in) HTTP 서버.
+# - 앱이 쓰는 엔드포인트(discover, 상세+append_to_response, watch/providers, credits, videos,
+#   장르 목록, 지역 목록, configuration, changes)와 포스터 이미지(/t/p/…)를 흉내 냄.
+# - 응답은 시드로 만든 고정 카탈로그에서 생성(같은 시드면 항상 같은 응답), 또는 녹화해 둔 fixture를 재생.
+# - 응답 지연(고정 + 흔들림)과 오류(5xx / 429 + Retry-After)를 비율로 주입.
+# - 앱은 TMDB_BASE_URL=http://127.0.0.1:<port>/3 로 이 서버를 바라보게 하면 됨.
+#
+# 사용 예:
+#   python fake_tmdb.py --port 8765 --latency-ms 80 --jitter-ms 40 --error-rate 0.02
+#   python fake_tmdb.py --fixtures fixtures/tmdb                      # 녹화본 재생 (없으면 생성)
+#   python fake_tmdb.py --fixtures fixtures/tmdb --record --upstream https://api.themoviedb.org/3
+#       (녹화: 없는 응답은 실제 TMDB에서 받아 저장, TMDB_API_KEY 필요)
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import struct
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+
+from moods import NETFLIX_PROVIDER_ID
+from ranking import TMDB_GENRE_IDS
+from tmdb_cache import cache_key, endpoint_family
+
+REGIONS = ("KR", "US", "JP", "GB", "DE", "FR", "BR", "IN", "CA", "AU")
+POSTER_SIZES = ["w92", "w154", "w185", "w342", "w500", "w780", "original"]
+CATALOG_SIZE = 1500       # 종류(movie/tv)별 작품 수
+PAGE_SIZE = 20
+OTHER_PROVIDERS = (337, 119, 350, 356, 97)
+
+
+def _png(width: int = 2, height: int = 3) -> bytes:
+    """단색 PNG (외부 라이브러리 없이)."""
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    raw = b"".join(b"\x00" + b"\xc0\x30\x30" * width for _ in range(height))
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(raw))
+        + chunk(b"IEND", b"")
+    )
+
+
+POSTER_PNG = _png()
+
+
+class Catalog:
+    """시드로 만든 가짜 작품 목록 (종류별 CATALOG_SIZE편)."""
+
+    def __init__(self, seed: int = 7, size: int = CATALOG_SIZE):
+        rng = random.Random(seed)
+        self.titles: Dict[str, List[dict]] = {}
+        self.by_id: Dict[Tuple[str, int], dict] = {}
+        self.offers: Dict[Tuple[str, int], dict] = {}
+        for kind, base in (("movie", 100000), ("tv", 200000)):
+            items = []
+            for i in range(size):
+                tmdb_id = base + i
+                item = {
+                    "id": tmdb_id,
+                    "title" if kind == "movie" else "name": f"{kind.upper()} {tmdb_id}",
+                    "overview": f"가짜 줄거리 {tmdb_id}",
+                    "poster_path": f"/poster{tmdb_id}.png",
+                    "vote_average": round(rng.uniform(3, 9.5), 1),
+                    "vote_count": rng.randint(0, 20000),
+                    "popularity": round(rng.paretovariate(1.5) * 10, 3),
+                    "genre_ids": rng.sample(TMDB_GENRE_IDS, rng.randint(1, 3)),
+                }
+                items.append(item)
+                self.by_id[(kind, tmdb_id)] = item
+                self.offers[(kind, tmdb_id)] = self._offers(rng)
+            items.sort(key=lambda x: -x["popularity"])
+            self.titles[kind] = items
+
+    @staticmethod
+    def _offers(rng: random.Random) -> dict:
+        results = {}
+        for region in REGIONS:
+            info: Dict[str, Any] = {"link": f"https://www.themoviedb.org/watch?locale={region}"}
+            if rng.random() < 0.45:
+                info[rng.choice(("flatrate", "flatrate", "ads"))] = [{"provider_id": NETFLIX_PROVIDER_ID, "provider_name": "Netflix"}]
+            if rng.random() < 0.5:
+                info.setdefault("rent", []).append({"provider_id": rng.choice(OTHER_PROVIDERS), "provider_name": "Other"})
+            if len(info) > 1:
+                results[region] = info
+        return {"results": results}
+
+    def on_netflix(self, kind: str, tmdb_id: int, region: str) -> bool:
+        info = self.offers[(kind, tmdb_id)]["results"].get(region) or {}
+        return any(o["provider_id"] == NETFLIX_PROVIDER_ID for offers in info.values() if isinstance(offers, list) for o in offers)
+
+
+class FakeTMDB:
+    """로컬 TMDB 대역 서버. start()로 백그라운드 스레드에서 띄우고 stop()으로 종료."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency_ms: float = 0,
+        jitter_ms: float = 0,
+        error_rate: float = 0,
+        throttle_rate: float = 0,
+        seed: int = 7,
+        fixtures: Optional[str] = None,
+        record: bool = False,
+        upstream: Optional[str] = None,
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.fixtures = fixtures
+        self.record = record
+        self.upstream = upstream.rstrip("/") if upstream else None
+        self.catalog = Catalog(seed)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._stats: Dict[str, int] = {}
+        self._thread: Optional[threading.Thread] = None
+        if fixtures:
+            os.makedirs(fixtures, exist_ok=True)
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                server.handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+
+    # --- 수명 ---
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def base_url(self) -> str:
+        """TMDB_BASE_URL로 넘길 값."""
+        return f"{self.url}/3"
+
+    def start(self) -> "FakeTMDB":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fake-tmdb", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "FakeTMDB":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    # --- 통계 ---
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] = self._stats.get(name, 0) + 1
+
+    def stats(self) -> Dict[str, int]:
+        """요청 수: total, 엔드포인트 종류별(api.<family>), images, 주입한 오류(injected_5xx/injected_429)."""
+        with self._lock:
+            return dict(self._stats)
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+    # --- 요청 처리 ---
+
+    def handle(self, h: BaseHTTPRequestHandler) -> None:
+        parts = urlsplit(h.path)
+        params = dict(parse_qsl(parts.query))
+        path = parts.path
+        self._count("total")
+
+        if path == "/__stats":
+            return self._send(h, 200, json.dumps(self.stats()).encode(), "application/json")
+        if path.startswith("/t/p/"):
+            self._count("images")
+            return self._send(h, 200, POSTER_PNG, "image/png")
+        if not path.startswith("/3/"):
+            return self._send_json(h, 404, {"status_code": 34, "status_message": "The resource you requested could not be found."})
+
+        endpoint = path[len("/3/"):]
+        self._count(f"api.{endpoint_family(endpoint)}")
+        self._sleep()
+
+        with self._lock:
+            roll = self._rng.random()
+        if roll < self.error_rate:
+            self._count("injected_5xx")
+            return self._send_json(h, 503, {"status_code": 503, "status_message": "Service unavailable (injected)."})
+        if roll < self.error_rate + self.throttle_rate:
+            self._count("injected_429")
+            return self._send_json(h, 429, {"status_code": 25, "status_message": "Too many requests (injected)."}, {"Retry-After": "1"})
+
+        if not params.get("api_key") and not h.headers.get("Authorization"):
+            return self._send_json(h, 401, {"status_code": 7, "status_message": "Invalid API key."})
+
+        payload = self._replay(endpoint, params, h)
+        if payload is None:
+            payload = self.generate(endpoint, params)
+        if payload is None:
+            return self._send_json(h, 404, {"status_code": 34, "status_message": "The resource you requested could not be found."})
+        self._send_json(h, 200, payload)
+
+    def _sleep(self) -> None:
+        delay = self.latency_ms
+        if self.jitter_ms:
+            with self._lock:
+                delay += self._rng.uniform(0, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+    def _send(self, h: BaseHTTPRequestHandler, status: int, body: bytes, content_type: str,
+              headers: Optional[Dict[str, str]] = None) -> None:
+        h.send_response(status)
+        h.send_header("Content-Type", content_type)
+        h.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            h.send_header(k, v)
+        h.end_headers()
+        h.wfile.write(body)
+
+    def _send_json(self, h: BaseHTTPRequestHandler, status: int, payload: Any,
+                   headers: Optional[Dict[str, str]] = None) -> None:
+        self._send(h, status, json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json;charset=utf-8", headers)
+
+    # --- fixture 재생/녹화 ---
+
+    def _fixture_file(self, endpoint: str, params: Dict[str, str]) -> str:
+        key = cache_key(endpoint, params)
+        return os.path.join(self.fixtures or "", hashlib.sha1(key.encode("utf-8")).hexdigest() + ".json")
+
+    def _replay(self, endpoint: str, params: Dict[str, str], h: BaseHTTPRequestHandler) -> Optional[Any]:
+        if not self.fixtures:
+            return None
+        path = self._fixture_file(endpoint, params)
+        try:
+            with open(path, encoding="utf-8") as f:
+                self._count("fixture_hits")
+                return json.load(f)["body"]
+        except (OSError, ValueError, KeyError):
+            pass
+        if not (self.record and self.upstream):
+            return None
+        headers = {"Authorization": h.headers["Authorization"]} if h.headers.get("Authorization") else {}
+        r = requests.get(f"{self.upstream}/{endpoint}", params=params, headers=headers, timeout=15)
+        if not r.ok:
+            return None
+        body = r.json()
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"key": cache_key(endpoint, params), "body": body}, f, ensure_ascii=False)
+        self._count("fixture_recorded")
+        return body
+
+    # --- 생성 ---
+
+    def generate(self, endpoint: str, params: Dict[str, str]) -> Optional[Any]:
+        parts = endpoint.strip("/").split("/")
+        head = parts[0]
+        if head == "genre" and len(parts) == 3:
+            return {"genres": [{"id": gid, "name": f"장르 {gid}"} for gid in TMDB_GENRE_IDS]}
+        if head == "configuration":
+            if parts[1:] == ["countries"]:
+                return [{"iso_3166_1": r, "english_name": r, "native_name": r} for r in REGIONS]
+            return {
+                "images": {
+                    "base_url": f"{self.url}/t/p/",
+                    "secure_base_url": f"{self.url}/t/p/",
+                    "poster_sizes": POSTER_SIZES,
+                },
+                "change_keys": [],
+            }
+        if parts == ["watch", "providers", "regions"]:
+            return {"results": [{"iso_3166_1": r, "english_name": r, "native_name": r} for r in REGIONS]}
+        if head == "discover" and len(parts) == 2 and parts[1] in self.catalog.titles:
+            return self._discover(parts[1], params)
+        if head in self.catalog.titles and len(parts) >= 2:
+            kind = head
+            if parts[1] == "changes":
+                ids = [x["id"] for x in self.catalog.titles[kind][::5]]
+                return {"results": [{"id": i, "adult": False} for i in ids], "page": 1, "total_pages": 1, "total_results": len(ids)}
+            try:
+                tmdb_id = int(parts[1])
+            except ValueError:
+                return None
+            if (kind, tmdb_id) not in self.catalog.by_id:
+                return None
+            rest = "/".join(parts[2:])
+            if not rest:
+                return self._details(kind, tmdb_id, params.get("append_to_response", ""))
+            return self._part(kind, tmdb_id, rest)
+        return None
+
+    def _discover(self, kind: str, params: Dict[str, str]) -> dict:
+        items = self.catalog.titles[kind]
+        genres = params.get("with_genres", "")
+        if genres:
+            if "|" in genres:
+                wanted = {int(g) for g in genres.split("|") if g}
+                items = [x for x in items if wanted.intersection(x["genre_ids"])]
+            else:
+                wanted = {int(g) for g in genres.split(",") if g}
+                items = [x for x in items if wanted.issubset(x["genre_ids"])]
+        region = params.get("watch_region")
+        if region and str(NETFLIX_PROVIDER_ID) in params.get("with_watch_providers", "").split("|"):
+            items = [x for x in items if self.catalog.on_netflix(kind, x["id"], region)]
+        page = max(1, int(params.get("page", 1) or 1))
+        total = len(items)
+        return {
+            "page": page,
+            "results": items[(page - 1) * PAGE_SIZE:page * PAGE_SIZE],
+            "total_pages": max(1, (total + PAGE_SIZE - 1) // PAGE_SIZE),
+            "total_results": total,
+        }
+
+    def _details(self, kind: str, tmdb_id: int, append: str) -> dict:
+        item = self.catalog.by_id[(kind, tmdb_id)]
+        details = {k: v for k, v in item.items() if k != "genre_ids"}
+        details["genres"] = [{"id": g, "name": f"장르 {g}"} for g in item["genre_ids"]]
+        if kind == "movie":
+            details.update({"runtime": 90 + tmdb_id % 60, "release_date": f"20{tmdb_id % 25:02d}-01-01"})
+        else:
+            details.update({
+                "number_of_seasons": 1 + tmdb_id % 5,
+                "number_of_episodes": 8 + tmdb_id % 40,
+                "first_air_date": f"20{tmdb_id % 25:02d}-01-01",
+                "last_air_date": "2025-12-31",
+            })
+        for part in filter(None, append.split(",")):
+            details[part] = self._part(kind, tmdb_id, part)
+        return details
+
+    def _part(self, kind: str, tmdb_id: int, part: str) -> Optional[dict]:
+        if part == "watch/providers":
+            return self.catalog.offers[(kind, tmdb_id)]
+        if part == "credits":
+            return {"id": tmdb_id, "cast": [{"id": tmdb_id * 10 + i, "name": f"배우 {i}", "order": i} for i in range(8)], "crew": []}
+        if part == "videos":
+            return {"id": tmdb_id, "results": [
+                {"iso_639_1": "en", "site": "YouTube", "type": "Trailer", "key": f"yt{tmdb_id}"},
+                {"iso_639_1": "ko", "site": "YouTube", "type": "Teaser", "key": f"ko{tmdb_id}"},
+            ]}
+        return None
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="로컬 TMDB 대역 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0, help="응답마다 더하는 지연(ms)")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="지연에 더하는 0~N ms 무작위 흔들림")
+    parser.add_argument("--error-rate", type=float, default=0, help="503으로 응답할 비율 (0~1)")
+    parser.add_argument("--throttle-rate", type=float, default=0, help="429(Retry-After: 1)로 응답할 비율 (0~1)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--fixtures", help="녹화 응답(JSON) 폴더: 있으면 재생, 없으면 생성")
+    parser.add_argument("--record", action="store_true", help="fixture가 없으면 --upstream에서 받아 저장")
+    parser.add_argument("--upstream", default="https://api.themoviedb.org/3")
+    args = parser.parse_args(argv)
+
+    server = FakeTMDB(
+        args.host, args.port, args.latency_ms, args.jitter_ms, args.error_rate, args.throttle_rate,
+        args.seed, args.fixtures, args.record, args.upstream if args.record else None,
+    )
+    print(f"fake TMDB: {server.base_url}  (TMDB_BASE_URL={server.base_url})")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+# loadtest.py
+# - Streamlit 워커 하나(이 프로세스)가 동시 사용자 몇 명까지 버티는지 보는 부하 테스트.
+# - Streamlit AppTest로 세션을 여러 개 동시에 돌림: 세션마다 자기 session_state를 갖고,
+#   st.cache_* / 공용 캐시 / TMDB 클라이언트는 실제 워커처럼 프로세스 안에서 공유.
+# - 시나리오
+#     test.py: 첫 로드 → 무드 토글 → "🔍 추천 보기" → 지역 변경 → 다시 추천 → 다음 페이지
+#     app.py : 첫 로드(헬스 체크) → "지역 코드 가져오기"
+# - TMDB 대신 로컬 대역 서버(fake_tmdb.py)를 씀. 동시 세션 수를 늘려 가며
+#   단계별 p50/p95/p99 지연, 처리량(단계/초), 메모리(RSS) 증가를 보고.
+# - 참고: AppTest는 fragment만 다시 실행하는 기능이 없어서 무드 토글·페이지 이동도 전체 재실행으로 잼
+#   (실제 브라우저보다 보수적인 수치).
+#
+# 사용 예:
+#   python loadtest.py                                  # 1, 2, 4, 8 동시 세션
+#   python loadtest.py --concurrency 1 4 16 --iterations 3 --latency-ms 80 --jitter-ms 40
+#   python loadtest.py --app app.py --json loadtest.json
+
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from bench import configure_env
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APPS = {"test.py": os.path.join(HERE, "test.py"), "app.py": os.path.join(HERE, "app.py")}
+SEARCH_LABEL = "🔍 추천 보기"
+REGIONS_LABEL = "지역 코드 가져오기"
+
+
+class StepResult(NamedTuple):
+    app: str
+    step: str
+    seconds: float
+    ok: bool
+    error: str = ""
+
+
+def rss_bytes() -> int:
+    """현재 RSS (리눅스는 /proc, 그 외는 최대 RSS로 대신)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return usage if sys.platform == "darwin" else usage * 1024
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def _button(at, label: str):
+    return next(b for b in at.button if b.label == label)
+
+
+class Session:
+    """AppTest 세션 하나. 단계마다 걸린 시간과 예외 여부를 기록."""
+
+    def __init__(self, app: str, timeout: float, record: Callable[[StepResult], None]):
+        from streamlit.testing.v1 import AppTest
+
+        self.app = app
+        self.at = AppTest.from_file(APPS[app], default_timeout=timeout)
+        self.record = record
+
+    def step(self, name: str, action: Callable[[], Any]) -> bool:
+        started = time.perf_counter()
+        error = ""
+        try:
+            action()
+            if self.at.exception:
+                error = self.at.exception[0].message
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        self.record(StepResult(self.app, name, time.perf_counter() - started, not error, error))
+        return not error
+
+
+def moodflix_flow(session: Session, rng: random.Random) -> None:
+    at = session.at
+    if not session.step("load", at.run):
+        return
+    mood_keys = [t.key for t in at.toggle if t.key and t.key.startswith("m_")]
+    for key in rng.sample(mood_keys, k=min(len(mood_keys), rng.randint(1, 3))):
+        session.step("mood_toggle", lambda key=key: at.toggle(key=key).set_value(True).run())
+    if not session.step("search", lambda: _button(at, SEARCH_LABEL).click().run()):
+        return
+    regions = list(at.selectbox(key="opt_country").options)
+    if len(regions) > 1:
+        current = at.selectbox(key="opt_country").value
+        target = rng.choice([r for r in regions if r != current])
+        session.step("region_switch", lambda: at.selectbox(key="opt_country").set_value(target).run())
+        session.step("search", lambda: _button(at, SEARCH_LABEL).click().run())
+    nav = [b for b in at.button if b.key == "results_next" and not b.disabled]
+    if nav:
+        session.step("next_page", lambda: at.button(key="results_next").click().run())
+
+
+def regions_demo_flow(session: Session, rng: random.Random) -> None:
+    at = session.at
+    if not session.step("load", at.run):
+        return
+    session.step("fetch_regions", lambda: _button(at, REGIONS_LABEL).click().run())
+
+
+FLOWS = {"test.py": moodflix_flow, "app.py": regions_demo_flow}
+
+
+def write_secrets(workdir: str) -> None:
+    """app.py가 st.secrets에서 키를 찾으므로 임시 secrets 파일을 만들어 가리킴.
+
+    AppTest.secrets는 실행마다 전역 st.secrets를 바꿨다 되돌려서 동시 세션끼리 꼬이므로 쓰지 않음.
+    """
+    path = os.path.join(workdir, "secrets.toml")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f'TMDB_API_KEY = "{os.environ.get("TMDB_API_KEY", "")}"\nTMDB_ACCESS_TOKEN = ""\n')
+    from streamlit import config
+
+    config.set_option("secrets.files", [path])
+
+
+def prepare_concurrent_apptest() -> None:
+    """AppTest를 여러 스레드에서 동시에 돌릴 수 있게 이 프로세스 안에서만 두 군데를 바꿈.
+
+    - AppTest는 실행마다 전역 Runtime을 모의 객체로 바꿨다가 끝나면 None으로 지움. 다른 세션이 지운 직후
+      스크립트가 Runtime을 찾다 실패하므로, 지워진 동안에는 마지막 모의 Runtime을 계속 돌려줌.
+    - AppTest는 실행마다 스크립트를 새로 컴파일하는데, 동시에 ast.parse를 하면 CPython이 오류를 낼 수 있음.
+      실제 서버처럼 컴파일 결과를 프로세스에서 한 벌만 두고 나눠 씀.
+    """
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+
+    compiled: Dict[str, Any] = {}
+    compile_lock = threading.Lock()
+    original_get_bytecode = ScriptCache.get_bytecode
+
+    def get_bytecode(self, script_path: str) -> Any:
+        with compile_lock:
+            if script_path not in compiled:
+                compiled[script_path] = original_get_bytecode(self, script_path)
+            return compiled[script_path]
+
+    ScriptCache.get_bytecode = get_bytecode
+
+    last: List[Any] = []
+
+    def instance(cls):
+        current = cls._instance
+        if current is not None:
+            last[:] = [current]
+            return current
+        if last:
+            return last[0]
+        raise RuntimeError("Runtime hasn't been created!")
+
+    Runtime.instance = classmethod(instance)
+
+
+def reset_caches() -> None:
+    """--cold: 단계(동시성 수준)마다 프로세스 캐시를 비워 첫 방문자 상황으로 시작."""
+    import streamlit as st
+    from availability import get_availability_index
+    from engine import get_result_cache
+    from tmdb_cache import get_shared_cache
+
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    get_shared_cache().clear()
+    get_availability_index().clear()
+    get_result_cache().clear()
+
+
+def run_level(apps: List[str], concurrency: int, iterations: int, timeout: float, seed: int) -> Dict[str, Any]:
+    results: List[StepResult] = []
+    lock = threading.Lock()
+
+    def record(r: StepResult) -> None:
+        with lock:
+            results.append(r)
+
+    def user(n: int) -> None:
+        rng = random.Random(seed * 1000 + n)
+        for i in range(iterations):
+            app = apps[(n + i) % len(apps)]
+            FLOWS[app](Session(app, timeout, record), rng)
+
+    rss_before = rss_bytes()
+    start = threading.Barrier(concurrency)
+
+    def run_user(n: int) -> None:
+        start.wait()
+        user(n)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=run_user, args=(n,), name=f"loadtest-user-{n}") for n in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+    rss_after = rss_bytes()
+
+    latencies = [r.seconds for r in results]
+    steps: Dict[str, Dict[str, Any]] = {}
+    for name in sorted({f"{r.app}:{r.step}" for r in results}):
+        values = [r.seconds for r in results if f"{r.app}:{r.step}" == name]
+        steps[name] = summarize(values, sum(1 for r in results if f"{r.app}:{r.step}" == name and not r.ok))
+    return {
+        "concurrency": concurrency,
+        "sessions": concurrency * iterations,
+        "wall_s": round(wall, 3),
+        "throughput_steps_per_s": round(len(results) / wall, 2) if wall else None,
+        "rss_mb": round(rss_after / 1024 / 1024, 1),
+        "rss_growth_mb": round((rss_after - rss_before) / 1024 / 1024, 1),
+        "overall": summarize(latencies, sum(1 for r in results if not r.ok)),
+        "steps": steps,
+        "errors": sorted({f"{r.app}:{r.step}: {r.error}" for r in results if not r.ok}),
+    }
+
+
+def summarize(values: List[float], errors: int) -> Dict[str, Any]:
+    def ms(q: float) -> Optional[float]:
+        v = percentile(values, q)
+        return None if v is None else round(v * 1000, 1)
+
+    return {"count": len(values), "errors": errors, "p50_ms": ms(0.5), "p95_ms": ms(0.95), "p99_ms": ms(0.99)}
+
+
+def print_report(levels: List[Dict[str, Any]], verbose: bool) -> None:
+    header = f"{'users':>6}{'sessions':>9}{'steps':>7}{'errs':>6}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'steps/s':>9}{'RSS MB':>8}{'ΔRSS':>7}"
+    print(header)
+    print("-" * len(header))
+    for lv in levels:
+        o = lv["overall"]
+        print(f"{lv['concurrency']:>6}{lv['sessions']:>9}{o['count']:>7}{o['errors']:>6}{o['p50_ms']:>9}{o['p95_ms']:>9}"
+              f"{o['p99_ms']:>9}{lv['throughput_steps_per_s']:>9}{lv['rss_mb']:>8}{lv['rss_growth_mb']:>7}")
+        if verbose:
+            for name, s in lv["steps"].items():
+                print(f"{'':>6}  {name:<26}{s['count']:>5}{s['errors']:>5}{s['p50_ms']:>9}{s['p95_ms']:>9}{s['p99_ms']:>9}")
+        for error in lv["errors"]:
+            print(f"{'':>6}  ! {error}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="MoodFlix 동시 세션 부하 테스트 (AppTest + 로컬 TMDB 대역 서버)")
+    parser.add_argument("--app", nargs="*", choices=sorted(APPS), default=["test.py", "app.py"], help="돌릴 앱 (세션마다 번갈아)")
+    parser.add_argument("--concurrency", nargs="*", type=int, default=[1, 2, 4, 8], help="동시 세션 수 단계")
+    parser.add_argument("--iterations", type=int, default=2, help="사용자 한 명이 반복하는 시나리오 수")
+    parser.add_argument("--latency-ms", type=float, default=30)
+    parser.add_argument("--jitter-ms", type=float, default=30)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--throttle-rate", type=float, default=0)
+    parser.add_argument("--timeout", type=float, default=120, help="AppTest 실행 한 번의 제한 시간(초)")
+    parser.add_argument("--cold", action="store_true", help="단계마다 캐시를 비우고 시작")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--verbose", action="store_true", help="단계(로드/검색/지역 변경…)별 지연도 출력")
+    parser.add_argument("--json", help="결과를 JSON으로 저장할 경로")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="moodflix-load-") as workdir:
+        configure_env(workdir, disk_cache=False)
+        write_secrets(workdir)
+        from fake_tmdb import FakeTMDB
+        from streamlit import logger as st_logger
+
+        st_logger.set_log_level("error")
+        prepare_concurrent_apptest()
+        server = FakeTMDB(
+            latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+            throttle_rate=args.throttle_rate, seed=args.seed,
+        ).start()
+        os.environ["TMDB_BASE_URL"] = server.base_url
+        levels = []
+        try:
+            for concurrency in args.concurrency:
+                if args.cold:
+                    reset_caches()
+                server.reset_stats()
+                level = run_level(args.app, concurrency, args.iterations, args.timeout, args.seed)
+                level["upstream"] = server.stats()
+                levels.append(level)
+        finally:
+            server.stop()
+
+    print_report(levels, args.verbose)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "levels": levels}, f, ensure_ascii=False, indent=2)
+    return 1 if any(lv["overall"]["errors"] for lv in levels) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,254 @@
+# metrics.py
+# - 프로세스 공용 성능 지표: 카운터와 지연 히스토그램 (이름 + 라벨).
+# - TMDB 요청(엔드포인트 종류별 지연/요청/재시도/오류), 캐시 적중/실패, 추천 단계별 시간을 모음.
+# - snapshot()은 JSON으로, to_prometheus()는 Prometheus 텍스트 형식으로 내보냄.
+# - MOODFLIX_METRICS_PORT를 주면 /metrics(Prometheus), /metrics.json을 내보내는 작은 HTTP 서버를 띄움.
+#   기본 주소는 127.0.0.1이고, 밖에서 긁어 가야 하면 MOODFLIX_METRICS_HOST로 넓힘.
+# - Streamlit에 의존하지 않음 (tmdb_client/tmdb_cache/엔진 어디서나 사용).
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+# 지연 히스토그램 버킷 상한(초)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# 지표 설명 (Prometheus HELP)
+DESCRIPTIONS = {
+    "tmdb_request_seconds": "TMDB HTTP 요청 지연 (엔드포인트 종류별)",
+    "tmdb_requests_total": "TMDB로 보낸 HTTP 요청 수 (상태 코드 묶음별)",
+    "tmdb_retries_total": "TMDB 요청 재시도 수",
+    "tmdb_errors_total": "호출자에게 빈 응답을 돌려준 TMDB 오류 수 (원인별)",
+    "cache_lookups_total": "캐시 조회 결과 수 (hit / stale / miss)",
+    "recommendation_stage_seconds": "추천 생성 단계별 소요 시간",
+    "tmdb_circuit_transitions_total": "TMDB 회로 차단기 상태 전환 수 (엔드포인트 종류별)",
+    "tmdb_short_circuits_total": "회로가 열려 보내지 않고 캐시/빈 값으로 답한 요청 수",
+    "tmdb_collapsed_total": "진행 중인 같은 요청에 합쳐져 따로 보내지 않은 호출 수",
+    "tmdb_rate_limited_total": "공용 토큰 버킷에서 기다린 뒤 보낸 요청 수",
+    "tmdb_throttled_total": "TMDB가 429로 속도 제한한 응답 수",
+    "tmdb_stale_served_total": "기간이 지난 캐시 값을 먼저 돌려주고 백그라운드로 재검증한 요청 수",
+}
+
+METRICS_PORT = int(os.getenv("MOODFLIX_METRICS_PORT", "0") or 0)
+# 기본은 이 호스트에서만 접근 (수집기가 다른 호스트면 MOODFLIX_METRICS_HOST=0.0.0.0 등으로 넓힘)
+METRICS_HOST = os.getenv("MOODFLIX_METRICS_HOST", "127.0.0.1")
+
+LabelKey = Tuple[Tuple[str, str], ...]
+T = TypeVar("T")
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(key) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # 마지막 칸은 +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        i = 0
+        while i < len(self.buckets) and value > self.buckets[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """버킷 기준 분위수 추정 (해당 버킷의 상한). 관측이 없으면 None."""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= target:
+                return self.buckets[i] if i < len(self.buckets) else float("inf")
+        return float("inf")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "avg": round(self.sum / self.count, 6) if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+class Metrics:
+    """카운터/히스토그램 모음 (스레드 안전)."""
+
+    def __init__(self):
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels: Any) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = Histogram()
+            hist.observe(seconds)
+
+    @contextmanager
+    def timer(self, name: str, **labels: Any) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def counter_value(self, name: str, **labels: Any) -> float:
+        with self._lock:
+            return self._counters.get(name, {}).get(_label_key(labels), 0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """{"counters": {이름: [{labels, value}]}, "histograms": {이름: [{labels, count, sum, avg, p50, p95, p99}]}}"""
+        with self._lock:
+            counters = {
+                name: [{"labels": dict(key), "value": value} for key, value in sorted(series.items())]
+                for name, series in sorted(self._counters.items())
+            }
+            histograms = {
+                name: [dict(labels=dict(key), **hist.to_dict()) for key, hist in sorted(series.items())]
+                for name, series in sorted(self._histograms.items())
+            }
+        return {"counters": counters, "histograms": histograms, "generated_at": time.time()}
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), ensure_ascii=False)
+
+    def to_prometheus(self, prefix: str = "moodflix_") -> str:
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                full = prefix + name
+                if name in DESCRIPTIONS:
+                    lines.append(f"# HELP {full} {DESCRIPTIONS[name]}")
+                lines.append(f"# TYPE {full} counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{full}{_format_labels(key)} {value:g}")
+            for name, series in sorted(self._histograms.items()):
+                full = prefix + name
+                if name in DESCRIPTIONS:
+                    lines.append(f"# HELP {full} {DESCRIPTIONS[name]}")
+                lines.append(f"# TYPE {full} histogram")
+                for key, hist in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(list(hist.buckets) + [float("inf")], hist.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                        lines.append(f"{full}_bucket{_format_labels(key, ('le', le))} {cumulative}")
+                    lines.append(f"{full}_sum{_format_labels(key)} {hist.sum:.6f}")
+                    lines.append(f"{full}_count{_format_labels(key)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+class StageTimer:
+    """한 번의 작업 안에서 단계별 시간을 누적. 단계가 겹치면(바깥 단계 안에서 안쪽 단계 실행)
+    안쪽 시간은 바깥 단계에서 빼서 단계 합이 전체 시간을 넘지 않게 함. 한 스레드에서만 사용."""
+
+    def __init__(self):
+        self.totals: Dict[str, float] = {}
+        self._stack: List[List[Any]] = []  # [단계, 시작 시각, 안쪽 단계 시간]
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        self._stack.append([name, time.perf_counter(), 0.0])
+        try:
+            yield
+        finally:
+            _, started, inner = self._stack.pop()
+            elapsed = time.perf_counter() - started
+            self.totals[name] = self.totals.get(name, 0.0) + elapsed - inner
+            if self._stack:
+                self._stack[-1][2] += elapsed
+
+    def iterate(self, name: str, items: Iterable[T]) -> Iterator[T]:
+        """제너레이터의 다음 값을 만드는 시간만 name 단계로 셈 (소비하는 쪽 시간은 제외)."""
+        it = iter(items)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(it)
+                except StopIteration:
+                    return
+            yield item
+
+    def publish(self, metrics: "Metrics", name: str = "recommendation_stage_seconds") -> None:
+        for stage, seconds in self.totals.items():
+            metrics.observe(name, seconds, stage=stage)
+
+
+_metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    """프로세스 공용 지표 모음."""
+    return _metrics
+
+
+def start_exporter(port: int = METRICS_PORT, host: str = METRICS_HOST, metrics: Optional[Metrics] = None) -> Optional[ThreadingHTTPServer]:
+    """/metrics(Prometheus 텍스트)와 /metrics.json을 내보내는 HTTP 서버를 백그라운드로 띄움.
+
+    port가 0이거나 이미 쓰는 중이면(다른 워커가 먼저 띄움) None.
+    """
+    if not port:
+        return None
+    source = metrics or get_metrics()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] == "/metrics":
+                body, ctype = source.to_prometheus().encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+            elif self.path.split("?")[0] == "/metrics.json":
+                body, ctype = source.to_json().encode("utf-8"), "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    try:
+        server = ThreadingHTTPServer((host, port), Handler)
+    except OSError:
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-exporter", daemon=True).start()
+    return server
@@ -0,0 +1,41 @@
+# moods.py
+# - 심리(무드) → TMDB 장르 매핑과 Netflix 제공 판단 기준.
+# - Streamlit 화면(test.py)과 오프라인 도구(snapshot.py)가 같이 씀.
+
+from typing import List
+
+# Netflix provider id (TMDB 기준)
+NETFLIX_PROVIDER_ID = 8
+
+# 제공 여부를 판단할 시청 방식(정액제/광고형/구매/대여)
+NETFLIX_MONETIZATION_TYPES = ("flatrate", "ads", "buy", "rent")
+
+# -------------------------------------
+# 심리 → 추천 파이프라인 설정
+# -------------------------------------
+
+MOODS = [
+    "불안", "우울", "스트레스", "외로움", "분노", "무기력",
+    "행복", "호기심", "설렘(로맨틱)", "두려움(스릴)", "위로/힐링", "몰입/도전"
+]
+
+# 각 심리에 연결할 장르/키워드 후보 (가중치 기반)
+MOOD_TO_GENRES = {
+    "불안": {"movie": [53, 9648], "tv": [80, 9648]},          # 스릴러, 미스터리 / 범죄
+    "우울": {"movie": [18, 10749], "tv": [18]},               # 드라마, 로맨스
+    "스트레스": {"movie": [35, 16], "tv": [35, 16]},          # 코미디, 애니
+    "외로움": {"movie": [18, 10749], "tv": [18]},             # 드라마/로맨스
+    "분노": {"movie": [28, 80], "tv": [10759, 80]},           # 액션, 범죄
+    "무기력": {"movie": [12, 14, 878], "tv": [10765, 10759]},# 모험, 판타지, SF / Sci-Fi & Fantasy, 액션&모험
+    "행복": {"movie": [35, 10402], "tv": [35]},              # 코미디, 음악
+    "호기심": {"movie": [99, 36], "tv": [99, 36]},           # 다큐, 역사
+    "설렘(로맨틱)": {"movie": [10749, 35], "tv": [10766, 35]},# 로맨스, 코미디(일일연속극 대체: Soap=10766)
+    "두려움(스릴)": {"movie": [27, 53], "tv": [9648, 80]},     # 공포, 스릴러 / 미스터리
+    "위로/힐링": {"movie": [16, 12, 10751], "tv": [16, 10751]},# 애니, 가족
+    "몰입/도전": {"movie": [18, 28], "tv": [18, 10759]},      # 드라마, 액션&모험
+}
+
+
+def mood_genres(kind: str) -> List[int]:
+    """모든 무드에 등장하는 kind(movie/tv) 장르 ID (중복 없이, 정렬)."""
+    return sorted({gid for mapping in MOOD_TO_GENRES.values() for gid in mapping.get(kind, [])})
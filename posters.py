@@ -0,0 +1,175 @@
+# posters.py
+# - 포스터 이미지를 TMDB CDN에서 받아 로컬 디스크에 보관하는 썸네일 캐시.
+# - /configuration의 poster_sizes 중 카드 폭에 맞는 가장 작은 크기를 골라 받음 (w500 고정 대신).
+# - 파일 하나 = 포스터 하나, 수정 시각(mtime)을 마지막 사용 시각으로 써서 상한을 넘으면 오래 안 쓴 것부터 삭제(LRU).
+# - 다음 페이지 포스터는 백그라운드 스레드로 미리 받아 둠 (UI 스레드는 절대 기다리지 않음).
+
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+from metrics import get_metrics
+from tmdb_client import get_client
+
+TMDB_IMG = "https://image.tmdb.org/t/p/"
+# configuration을 못 받았을 때 쓰는 TMDB 기본 포스터 크기 목록
+DEFAULT_POSTER_SIZES = ("w92", "w154", "w185", "w342", "w500", "w780", "original")
+
+# 카드에 필요한 포스터 폭(px): 3열 그리드 한 칸 + 고해상도 화면 여유
+POSTER_TARGET_WIDTH = int(os.getenv("MOODFLIX_POSTER_WIDTH", "342"))
+# 썸네일 캐시 폴더 (빈 문자열이면 디스크 캐시 끄고 CDN 주소로만 표시)
+POSTER_CACHE_DIR = os.getenv("MOODFLIX_POSTER_CACHE", os.path.join(".tmdb_cache", "posters"))
+# 디스크 사용 상한(바이트)
+POSTER_CACHE_MAX_BYTES = int(os.getenv("MOODFLIX_POSTER_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# 미리 받기 동시 다운로드 수
+POSTER_PREFETCH_WORKERS = int(os.getenv("MOODFLIX_POSTER_PREFETCH_WORKERS", "4"))
+
+POSTER_TIMEOUT = 10
+
+
+def pick_poster_size(sizes: Sequence[str], width: int = POSTER_TARGET_WIDTH) -> str:
+    """폭이 width 이상인 가장 작은 "w…" 크기. 모두 작으면 가장 큰 것, 목록이 비면 original."""
+    widths = sorted(int(s[1:]) for s in sizes if s.startswith("w") and s[1:].isdigit())
+    for w in widths:
+        if w >= width:
+            return f"w{w}"
+    if "original" in sizes or not widths:
+        return "original"
+    return f"w{widths[-1]}"
+
+
+def poster_url(poster_path: str, size: str, base_url: str = TMDB_IMG) -> str:
+    return f"{base_url.rstrip('/')}/{size}{poster_path}"
+
+
+class PosterCache:
+    """디스크 썸네일 캐시. 같은 프로세스의 여러 세션/스레드가 공유."""
+
+    def __init__(self, directory: str = POSTER_CACHE_DIR, max_bytes: int = POSTER_CACHE_MAX_BYTES,
+                 prefetch_workers: int = POSTER_PREFETCH_WORKERS):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._pending: Set[str] = set()
+        self._pool = ThreadPoolExecutor(max_workers=max(1, prefetch_workers), thread_name_prefix="poster-prefetch")
+        # 시작 시 한 번만 전체 크기를 세고 이후엔 쓰기/삭제 때 증감
+        self._total = sum(size for _, size, _ in self._scan())
+
+    def _file(self, url: str) -> str:
+        name = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, name + os.path.splitext(url)[1])
+
+    def _scan(self) -> List[tuple]:
+        entries = []
+        with os.scandir(self.directory) as it:
+            for e in it:
+                if e.is_file() and not e.name.endswith(".tmp"):
+                    info = e.stat()
+                    entries.append((e.path, info.st_size, info.st_mtime))
+        return entries
+
+    def get(self, url: str) -> Optional[bytes]:
+        """캐시에 있으면 이미지 바이트 (사용 시각 갱신), 없으면 None. 네트워크 안 씀."""
+        path = self._file(url)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            get_metrics().inc("cache_lookups_total", cache="posters", result="miss")
+            return None
+        get_metrics().inc("cache_lookups_total", cache="posters", result="hit")
+        return data
+
+    def fetch(self, url: str) -> Optional[bytes]:
+        """캐시 우선, 없으면 CDN에서 받아 저장. 실패하면 None."""
+        data = self.get(url)
+        if data is not None:
+            return data
+        try:
+            # 연결 풀만 함께 쓰고, 세션 기본값인 JSON accept 대신 이미지를 요청
+            r = get_client().session.get(url, headers={"accept": "image/*"}, timeout=POSTER_TIMEOUT)
+        except Exception:
+            return None
+        if r.status_code != 200 or not r.headers.get("content-type", "").startswith("image/"):
+            return None
+        self._store(url, r.content)
+        return r.content
+
+    def _store(self, url: str, data: bytes) -> None:
+        path = self._file(url)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(data)
+            try:
+                replaced = os.path.getsize(path)
+            except OSError:
+                replaced = 0
+            os.replace(tmp, path)
+        except OSError:
+            return
+        with self._lock:
+            self._total += len(data) - replaced
+            over = self._total > self.max_bytes
+        if over:
+            self._evict()
+
+    def _evict(self) -> None:
+        # 상한의 90%까지 오래 안 쓴(mtime 오래된) 파일부터 삭제
+        with self._lock:
+            entries = sorted(self._scan(), key=lambda e: e[2])
+            total = sum(size for _, size, _ in entries)
+            target = int(self.max_bytes * 0.9)
+            for path, size, _ in entries:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+            self._total = total
+
+    def prefetch(self, urls: Iterable[str]) -> None:
+        """캐시에 없는 포스터를 백그라운드로 받아 둠 (이미 받는 중이면 건너뜀)."""
+        for url in urls:
+            if os.path.exists(self._file(url)):
+                continue
+            with self._lock:
+                if url in self._pending:
+                    continue
+                self._pending.add(url)
+            self._pool.submit(self._prefetch_one, url)
+
+    def _prefetch_one(self, url: str) -> None:
+        try:
+            self.fetch(url)
+        finally:
+            with self._lock:
+                self._pending.discard(url)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"bytes": self._total, "pending": len(self._pending)}
+
+
+_cache: Optional[PosterCache] = None
+_cache_disabled = not POSTER_CACHE_DIR
+_cache_lock = threading.Lock()
+
+
+def get_poster_cache() -> Optional[PosterCache]:
+    """프로세스 공용 포스터 캐시 (MOODFLIX_POSTER_CACHE가 비어 있거나 폴더를 못 만들면 None)."""
+    global _cache, _cache_disabled
+    if _cache is None and not _cache_disabled:
+        with _cache_lock:
+            if _cache is None and not _cache_disabled:
+                try:
+                    _cache = PosterCache()
+                except OSError:
+                    _cache_disabled = True
+    return _cache
@@ -0,0 +1,184 @@
+# ranking.py
+# - 추천 후보를 열(column) 단위 NumPy 배열로 압축해 두고 한 번에 점수를 계산하는 랭킹.
+# - 원본 TMDB dict 대신 id/종류/평점/투표 수/인기도/장르 비트마스크(+ 카드 머리에 쓰는 제목·포스터 경로·공개일)만 보관.
+# - discover 캐시와 최종 추천 결과 캐시가 이 열 묶음을 그대로 보관하고, 화면에 그릴 때만 작은 dict로 풀어 줌.
+# - 평점(0~10)과 인기도(상한 없음)를 각각 0~1로 정규화한 뒤 섞고, 무드 장르 가중치를 곱함.
+# - 상위 k개는 전체 정렬 없이 argpartition으로 고름.
+
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+# TMDB 영화/TV 장르 ID → 비트 위치 (목록에 없는 장르는 비트 없음)
+TMDB_GENRE_IDS = (
+    28, 12, 16, 35, 80, 99, 18, 10751, 14, 36, 27, 10402, 9648, 10749, 878, 10770, 53, 10752, 37,
+    10759, 10762, 10763, 10764, 10765, 10766, 10767, 10768,
+)
+GENRE_BIT = {gid: i for i, gid in enumerate(TMDB_GENRE_IDS)}
+
+# 평점이 투표 수 적은 작품에 휘둘리지 않도록 섞는 가상 투표 수
+MIN_VOTES = 50
+RATING_WEIGHT = 0.6
+POPULARITY_WEIGHT = 0.4
+
+# 종류 열에 저장하는 코드 (KINDS[code] = "movie" / "tv")
+KINDS = ("movie", "tv")
+KIND_CODE = {kind: i for i, kind in enumerate(KINDS)}
+
+
+def genre_mask(genre_ids: Sequence[int]) -> int:
+    mask = 0
+    for gid in genre_ids:
+        bit = GENRE_BIT.get(gid)
+        if bit is not None:
+            mask |= 1 << bit
+    return mask
+
+
+def genre_ids_of(mask: int) -> List[int]:
+    """비트마스크 → 장르 ID 목록 (TMDB_GENRE_IDS 순서, 표에 없던 장르는 빠짐)."""
+    return [gid for gid, bit in GENRE_BIT.items() if mask >> bit & 1]
+
+
+class CandidateStore:
+    """후보 목록을 열 단위로 담은 압축 저장소. 각 배열/목록의 i번째가 같은 작품.
+
+    (kind, 작품 dict) 목록처럼 읽을 수 있음: 길이, 순회, 인덱스/슬라이스 접근 시
+    item(i)로 카드에 필요한 필드만 담은 작은 dict를 그때그때 만들어 줌 (원본 TMDB dict는 보관하지 않음).
+    한 번 만든 저장소는 바꾸지 않음 (take/concat은 새 저장소를 만듦) → 캐시에서 여러 세션이 나눠 써도 됨.
+    """
+
+    __slots__ = ("ids", "kinds", "vote_average", "vote_count", "popularity", "genres", "titles", "posters", "dates")
+
+    def __init__(self, ids: np.ndarray, kinds: np.ndarray, vote_average: np.ndarray, vote_count: np.ndarray,
+                 popularity: np.ndarray, genres: np.ndarray, titles: List[str], posters: List[Optional[str]],
+                 dates: List[Optional[str]]):
+        self.ids = ids
+        self.kinds = kinds
+        self.vote_average = vote_average
+        self.vote_count = vote_count
+        self.popularity = popularity
+        self.genres = genres
+        self.titles = titles
+        self.posters = posters
+        self.dates = dates
+
+    @classmethod
+    def from_items(cls, kind: str, items: Sequence[dict]) -> "CandidateStore":
+        """TMDB discover 결과(dict 목록) → 저장소. 같은 종류(kind)의 작품만."""
+        n = len(items)
+        return cls(
+            ids=np.fromiter((x.get("id") or 0 for x in items), dtype=np.int64, count=n),
+            kinds=np.full(n, KIND_CODE[kind], dtype=np.int8),
+            vote_average=np.fromiter((x.get("vote_average") or 0 for x in items), dtype=np.float32, count=n),
+            vote_count=np.fromiter((x.get("vote_count") or 0 for x in items), dtype=np.float32, count=n),
+            popularity=np.fromiter((x.get("popularity") or 0 for x in items), dtype=np.float32, count=n),
+            genres=np.fromiter((genre_mask(x.get("genre_ids", [])) for x in items), dtype=np.int64, count=n),
+            titles=[x.get("title") or x.get("name") or "" for x in items],
+            posters=[x.get("poster_path") for x in items],
+            dates=[x.get("release_date") or x.get("first_air_date") for x in items],
+        )
+
+    @classmethod
+    def empty(cls) -> "CandidateStore":
+        return cls.from_items(KINDS[0], [])
+
+    @classmethod
+    def concat(cls, stores: Sequence["CandidateStore"]) -> "CandidateStore":
+        stores = [s for s in stores if len(s)]
+        if len(stores) == 1:
+            return stores[0]
+        if not stores:
+            return cls.empty()
+        return cls(
+            *(np.concatenate([getattr(s, col) for s in stores]) for col in ("ids", "kinds", "vote_average", "vote_count", "popularity", "genres")),
+            titles=[t for s in stores for t in s.titles],
+            posters=[p for s in stores for p in s.posters],
+            dates=[d for s in stores for d in s.dates],
+        )
+
+    def take(self, indices: Sequence[int]) -> "CandidateStore":
+        """indices 순서대로 고른 새 저장소."""
+        idx = np.asarray(indices, dtype=np.int64)
+        rows = idx.tolist()
+        return CandidateStore(
+            self.ids[idx], self.kinds[idx], self.vote_average[idx], self.vote_count[idx],
+            self.popularity[idx], self.genres[idx],
+            [self.titles[i] for i in rows], [self.posters[i] for i in rows], [self.dates[i] for i in rows],
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def kind(self, i: int) -> str:
+        return KINDS[int(self.kinds[i])]
+
+    def keys(self) -> List[Tuple[str, int]]:
+        """(kind, id) 목록 (dict를 만들지 않음)."""
+        return [(KINDS[k], i) for k, i in zip(self.kinds.tolist(), self.ids.tolist())]
+
+    def item(self, i: int) -> dict:
+        """카드/JSON 출력용 작은 dict (호출할 때마다 새로 만듦)."""
+        movie = self.kind(i) == "movie"
+        return {
+            "id": int(self.ids[i]),
+            "title" if movie else "name": self.titles[i],
+            "poster_path": self.posters[i],
+            "release_date" if movie else "first_air_date": self.dates[i],
+            "vote_average": round(float(self.vote_average[i]), 3),
+            "vote_count": int(self.vote_count[i]),
+            "popularity": round(float(self.popularity[i]), 3),
+            "genre_ids": genre_ids_of(int(self.genres[i])),
+        }
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[Tuple[str, dict], List[Tuple[str, dict]]]:
+        if isinstance(i, slice):
+            return [(self.kind(j), self.item(j)) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.kind(i), self.item(i)
+
+    def __iter__(self) -> Iterator[Tuple[str, dict]]:
+        for i in range(len(self)):
+            yield self.kind(i), self.item(i)
+
+    def scores(self, genre_weight: Optional[Dict[int, int]] = None) -> np.ndarray:
+        """정규화 평점·인기도 혼합 점수 × (1 + 무드 장르 적합도)."""
+        if not len(self):
+            return np.zeros(0, dtype=np.float32)
+        # 투표 수로 보정한 평점(베이지안 평균) → 0~1
+        mean = float(self.vote_average.mean())
+        v = self.vote_count
+        rating = (v * self.vote_average + MIN_VOTES * mean) / (v + MIN_VOTES) / 10.0
+        # 인기도는 꼬리가 길어 로그 후 후보 안에서 최대값으로 나눔 → 0~1
+        pop = np.log1p(self.popularity)
+        top = float(pop.max())
+        pop = pop / top if top > 0 else pop
+        score = RATING_WEIGHT * rating + POPULARITY_WEIGHT * pop
+
+        if genre_weight:
+            total = sum(genre_weight.values())
+            weights = np.zeros(len(TMDB_GENRE_IDS), dtype=np.float32)
+            for gid, w in genre_weight.items():
+                bit = GENRE_BIT.get(gid)
+                if bit is not None:
+                    weights[bit] = w
+            bits = (self.genres[:, None] >> np.arange(len(TMDB_GENRE_IDS))) & 1
+            score = score * (1 + bits.astype(np.float32) @ weights / total)
+        return score
+
+    def top_k(self, k: int, genre_weight: Optional[Dict[int, int]] = None) -> np.ndarray:
+        """점수 상위 k개의 인덱스(점수 내림차순)."""
+        n = len(self)
+        k = min(k, n)
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64)
+        neg = -self.scores(genre_weight)
+        idx = np.argpartition(neg, k - 1)[:k] if k < n else np.arange(n)
+        return idx[np.argsort(neg[idx], kind="stable")]
+
+    def ranked(self, k: int, genre_weight: Optional[Dict[int, int]] = None) -> "CandidateStore":
+        """점수 상위 k개를 점수순으로 담은 새 저장소."""
+        return self.take(self.top_k(k, genre_weight))
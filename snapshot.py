@@ -0,0 +1,314 @@
+# snapshot.py
+# - MOOD_TO_GENRES 장르의 discover 결과와 시청 제공사 정보를 로컬 SQLite 스냅샷으로 저장.
+# - test.py의 "오프라인 스냅샷" 모드는 이 파일만 읽어 추천 후보를 고름 (요청 경로에 네트워크 없음).
+# - 장르/지역/제공사에 인덱스가 있어 후보 조회가 빠름.
+# - refresh는 TMDB changes API로 바뀐 작품만 다시 받음.
+# - 수집/갱신 요청은 응답 캐시를 거치지 않음 (캐시의 옛 값이나 CLI 종료와 함께 사라지는 백그라운드 재검증에 기대지 않도록).
+#
+# 사용법:
+#   python snapshot.py ingest --pages 5          # 전체 수집
+#   python snapshot.py refresh                   # 마지막 수집 이후 바뀐 작품만 갱신
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from moods import NETFLIX_MONETIZATION_TYPES, NETFLIX_PROVIDER_ID, mood_genres
+from tmdb_client import TMDBClient, get_client
+
+# 스냅샷 파일 위치
+SNAPSHOT_PATH = os.getenv("MOODFLIX_SNAPSHOT_PATH", "moodflix_snapshot.sqlite3")
+
+# TMDB changes API는 최근 14일까지만 조회 가능
+CHANGES_MAX_DAYS = 14
+
+KINDS = ("movie", "tv")
+
+
+class SnapshotStore:
+    """스냅샷 SQLite 파일. 스레드마다 연결을 따로 열어 씀."""
+
+    def __init__(self, path: str = SNAPSHOT_PATH, readonly: bool = False):
+        self.path = path
+        self.readonly = readonly
+        self._local = threading.local()
+        if not readonly:
+            self._create_schema()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self.readonly:
+                conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            else:
+                conn = sqlite3.connect(self.path, timeout=30)
+                conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _create_schema(self) -> None:
+        with self._conn() as conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS titles (
+                    kind TEXT NOT NULL,
+                    id INTEGER NOT NULL,
+                    popularity REAL NOT NULL DEFAULT 0,
+                    vote_average REAL NOT NULL DEFAULT 0,
+                    payload TEXT NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (kind, id)
+                );
+                CREATE TABLE IF NOT EXISTS title_genres (
+                    kind TEXT NOT NULL,
+                    id INTEGER NOT NULL,
+                    genre_id INTEGER NOT NULL,
+                    PRIMARY KEY (kind, id, genre_id)
+                );
+                CREATE INDEX IF NOT EXISTS title_genres_genre ON title_genres(kind, genre_id);
+                CREATE TABLE IF NOT EXISTS availability (
+                    kind TEXT NOT NULL,
+                    id INTEGER NOT NULL,
+                    region TEXT NOT NULL,
+                    provider_id INTEGER NOT NULL,
+                    monetization TEXT NOT NULL,
+                    PRIMARY KEY (kind, id, region, provider_id, monetization)
+                );
+                CREATE INDEX IF NOT EXISTS availability_region ON availability(region, provider_id, kind);
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL
+                );
+                """
+            )
+
+    # --- 쓰기 ---
+
+    def upsert_titles(self, kind: str, items: Iterable[dict]) -> int:
+        now = time.time()
+        count = 0
+        with self._conn() as conn:
+            for x in items:
+                if not x.get("id"):
+                    continue
+                conn.execute(
+                    "INSERT OR REPLACE INTO titles (kind, id, popularity, vote_average, payload, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (kind, x["id"], x.get("popularity") or 0, x.get("vote_average") or 0,
+                     json.dumps(x, ensure_ascii=False), now),
+                )
+                conn.execute("DELETE FROM title_genres WHERE kind = ? AND id = ?", (kind, x["id"]))
+                conn.executemany(
+                    "INSERT OR IGNORE INTO title_genres (kind, id, genre_id) VALUES (?, ?, ?)",
+                    [(kind, x["id"], gid) for gid in x.get("genre_ids", [])],
+                )
+                count += 1
+        return count
+
+    def replace_availability(self, kind: str, tmdb_id: int, provider_data: dict) -> None:
+        """watch/providers 응답(모든 지역 포함)으로 작품의 제공 정보를 통째로 교체."""
+        rows = []
+        for region, info in (provider_data.get("results") or {}).items():
+            for monetization in NETFLIX_MONETIZATION_TYPES:
+                for offer in info.get(monetization) or []:
+                    if offer.get("provider_id") is not None:
+                        rows.append((kind, tmdb_id, region, offer["provider_id"], monetization))
+        with self._conn() as conn:
+            conn.execute("DELETE FROM availability WHERE kind = ? AND id = ?", (kind, tmdb_id))
+            conn.executemany(
+                "INSERT OR IGNORE INTO availability (kind, id, region, provider_id, monetization) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def set_meta(self, key: str, value: str) -> None:
+        with self._conn() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    # --- 읽기 ---
+
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self._conn().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def title_ids(self, kind: str) -> List[int]:
+        return [r[0] for r in self._conn().execute("SELECT id FROM titles WHERE kind = ?", (kind,))]
+
+    def discover(
+        self,
+        kind: str,
+        genre_ids: Sequence[int],
+        region: Optional[str] = None,
+        provider_id: int = NETFLIX_PROVIDER_ID,
+        monetization: Sequence[str] = NETFLIX_MONETIZATION_TYPES,
+        limit: int = 60,
+        offset: int = 0,
+    ) -> List[dict]:
+        """장르 중 하나라도 해당(OR)하는 작품을 인기순으로. region을 주면 그 지역 제공작만."""
+        if not genre_ids:
+            return []
+        sql = (
+            "SELECT t.payload FROM titles t WHERE t.kind = ? AND EXISTS ("
+            " SELECT 1 FROM title_genres g WHERE g.kind = t.kind AND g.id = t.id"
+            f" AND g.genre_id IN ({','.join('?' * len(genre_ids))}))"
+        )
+        args: List = [kind, *genre_ids]
+        if region:
+            sql += (
+                " AND EXISTS (SELECT 1 FROM availability a WHERE a.kind = t.kind AND a.id = t.id"
+                f" AND a.region = ? AND a.provider_id = ? AND a.monetization IN ({','.join('?' * len(monetization))}))"
+            )
+            args += [region, provider_id, *monetization]
+        sql += " ORDER BY t.popularity DESC LIMIT ? OFFSET ?"
+        args += [limit, offset]
+        return [json.loads(r[0]) for r in self._conn().execute(sql, args)]
+
+    def providers(self, kind: str, tmdb_id: int) -> dict:
+        """저장된 제공 정보를 watch/providers 응답 모양으로 복원."""
+        results: Dict[str, Dict[str, List[dict]]] = {}
+        rows = self._conn().execute(
+            "SELECT region, provider_id, monetization FROM availability WHERE kind = ? AND id = ?",
+            (kind, tmdb_id),
+        )
+        for region, provider_id, monetization in rows:
+            results.setdefault(region, {}).setdefault(monetization, []).append({"provider_id": provider_id})
+        return {"id": tmdb_id, "results": results}
+
+
+# -------------------------------------
+# 수집 / 갱신
+# -------------------------------------
+
+def _fetch_providers(
+    client: TMDBClient, store: SnapshotStore, titles: List[Tuple[str, int]], auth: Dict[str, str], max_workers: int
+) -> None:
+    def fetch(title: Tuple[str, int]) -> Tuple[Tuple[str, int], dict]:
+        kind, tmdb_id = title
+        return title, client.request(f"{kind}/{tmdb_id}/watch/providers", use_cache=False, **auth)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for i, ((kind, tmdb_id), data) in enumerate(pool.map(fetch, titles), 1):
+            if data:
+                store.replace_availability(kind, tmdb_id, data)
+            if i % 100 == 0 or i == len(titles):
+                print(f"  제공사 {i}/{len(titles)}", file=sys.stderr)
+
+
+def ingest(store: SnapshotStore, auth: Dict[str, str], pages: int = 5, max_workers: int = 8, language: str = "ko-KR") -> int:
+    """무드 장르별 discover 페이지를 모두 받아 저장하고, 받은 작품의 제공사 정보도 저장."""
+    client = get_client()
+    titles: Dict[Tuple[str, int], None] = {}
+    for kind in KINDS:
+        for gid in mood_genres(kind):
+            for p in range(1, pages + 1):
+                data = client.request(
+                    f"discover/{kind}",
+                    {"language": language, "sort_by": "popularity.desc", "include_adult": "false",
+                     "page": p, "with_genres": gid},
+                    use_cache=False,
+                    **auth,
+                )
+                results = data.get("results", [])
+                store.upsert_titles(kind, results)
+                titles.update(((kind, x["id"]), None) for x in results if x.get("id"))
+                if p >= (data.get("total_pages") or 0):
+                    break
+            print(f"{kind} 장르 {gid}: 누적 {len(titles)}편", file=sys.stderr)
+    _fetch_providers(client, store, list(titles), auth, max_workers)
+    store.set_meta("last_refresh", date.today().isoformat())
+    return len(titles)
+
+
+def changed_ids(client: TMDBClient, kind: str, since: date, auth: Dict[str, str]) -> List[int]:
+    """TMDB changes API로 since 이후 바뀐 작품 ID 목록."""
+    ids: List[int] = []
+    page, total = 1, 1
+    while page <= total:
+        data = client.request(
+            f"{kind}/changes",
+            {"start_date": since.isoformat(), "end_date": date.today().isoformat(), "page": page},
+            use_cache=False,
+            **auth,
+        )
+        ids.extend(x["id"] for x in data.get("results", []) if x.get("id"))
+        total = data.get("total_pages") or 0
+        page += 1
+    return ids
+
+
+def refresh(store: SnapshotStore, auth: Dict[str, str], max_workers: int = 8, language: str = "ko-KR") -> int:
+    """마지막 수집 이후 바뀐 작품만 상세(인기도/평점 등)와 제공사 정보를 다시 받음."""
+    client = get_client()
+    last = store.get_meta("last_refresh")
+    if not last:
+        raise SystemExit("스냅샷이 비어 있어요. 먼저 ingest를 실행해주세요.")
+    since = max(date.fromisoformat(last), date.today() - timedelta(days=CHANGES_MAX_DAYS))
+    if date.fromisoformat(last) < since:
+        print(f"마지막 수집({last})이 {CHANGES_MAX_DAYS}일보다 오래돼 그 이전 변경분은 놓칠 수 있어요.", file=sys.stderr)
+
+    def fetch(title: Tuple[str, int]) -> Tuple[Tuple[str, int], dict]:
+        kind, tmdb_id = title
+        return title, client.request(
+            f"{kind}/{tmdb_id}",
+            {"language": language, "append_to_response": "watch/providers"},
+            use_cache=False,
+            **auth,
+        )
+
+    todo: List[Tuple[str, int]] = []
+    for kind in KINDS:
+        known = set(store.title_ids(kind))
+        todo.extend((kind, tmdb_id) for tmdb_id in changed_ids(client, kind, since, auth) if tmdb_id in known)
+    print(f"바뀐 작품 {len(todo)}편 갱신", file=sys.stderr)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for (kind, tmdb_id), data in pool.map(fetch, todo):
+            if not data:
+                continue
+            # 응답 dict는 클라이언트가 다른 호출자와 나눠 쓸 수 있으므로 고치지 않고 새 dict를 만듦
+            providers = data.get("watch/providers") or {}
+            title = {k: v for k, v in data.items() if k != "watch/providers"}
+            # 상세 응답의 genres를 discover 결과와 같은 genre_ids 모양으로 맞춤
+            title.setdefault("genre_ids", [g.get("id") for g in data.get("genres", []) if g.get("id")])
+            store.upsert_titles(kind, [title])
+            store.replace_availability(kind, tmdb_id, providers)
+    store.set_meta("last_refresh", date.today().isoformat())
+    return len(todo)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except Exception:
+        pass
+
+    parser = argparse.ArgumentParser(description="MoodFlix 오프라인 TMDB 스냅샷 수집/갱신")
+    parser.add_argument("command", choices=("ingest", "refresh"))
+    parser.add_argument("--path", default=SNAPSHOT_PATH, help="스냅샷 SQLite 파일 경로")
+    parser.add_argument("--pages", type=int, default=5, help="장르별 discover 페이지 수 (ingest)")
+    parser.add_argument("--workers", type=int, default=8, help="제공사 조회 동시 요청 수")
+    args = parser.parse_args(argv)
+
+    auth = {"api_key": os.getenv("TMDB_API_KEY", ""), "access_token": os.getenv("TMDB_ACCESS_TOKEN", "")}
+    if not any(auth.values()):
+        raise SystemExit("TMDB_API_KEY(또는 TMDB_ACCESS_TOKEN) 환경변수가 필요해요.")
+
+    store = SnapshotStore(args.path)
+    if args.command == "ingest":
+        n = ingest(store, auth, pages=args.pages, max_workers=args.workers)
+        print(f"완료: {n}편 저장 → {args.path}")
+    else:
+        n = refresh(store, auth, max_workers=args.workers)
+        print(f"완료: {n}편 갱신 → {args.path}")
+
+
+if __name__ == "__main__":
+    main()
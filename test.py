@@ -5,13 +5,25 @@
 # - 오류를 줄이기 위해 긴 설명은 주석(#)으로만 표기합니다.
 
 import os
-import random
+import threading
 import time
-from typing import Dict, List, Tuple, Optional
+from typing import Callable, Dict, Iterable, List, Tuple, Optional
 
-import requests
 import streamlit as st
 from dotenv import load_dotenv
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+from engine import (
+    DEFAULT_MOODS, MAX_CONCURRENT_REQUESTS, TITLE_BUNDLE_PARTS, WARM_REGIONS, WarmerStatus, configure,
+    get_recommendations, get_snapshot, get_title_bundle, iter_title_bundles, netflix_available,
+    netflix_regions, recommendation_profile, tmdb_request, warm_caches, warm_profiles,
+)
+from metrics import get_metrics, start_exporter
+from moods import MOODS
+from posters import DEFAULT_POSTER_SIZES, TMDB_IMG, get_poster_cache, pick_poster_size, poster_url
+from ranking import CandidateStore
+from tmdb_cache import shared_cache
+from tmdb_client import get_client
 
 # -------------------------------------
 # 기본 설정
@@ -29,32 +41,30 @@ except Exception:
     pass
 
 TMDB_API_KEY = os.getenv("TMDB_API_KEY", "")
-TMDB_BASE = "https://api.themoviedb.org/3"
-TMDB_IMG = "https://image.tmdb.org/t/p/"
-
-# Netflix provider id (TMDB 기준)
-NETFLIX_PROVIDER_ID = 8
+TMDB_ACCESS_TOKEN = os.getenv("TMDB_ACCESS_TOKEN", "")
 
 # -------------------------------------
-# 유틸: TMDB 요청
+# 추천 엔진 연결 (engine.py는 Streamlit을 모름)
 # -------------------------------------
 
-def tmdb_request(endpoint: str, params: Optional[dict] = None) -> dict:
-    """TMDB API 호출 헬퍼 (오류 내성 포함)."""
-    url = f"{TMDB_BASE}/{endpoint.lstrip('/')}"
-    headers = {"accept": "application/json"}
-    params = params.copy() if params else {}
-    params["api_key"] = st.session_state.get("TMDB_API_KEY", TMDB_API_KEY)
-
-    try:
-        r = requests.get(url, headers=headers, params=params, timeout=15)
-        r.raise_for_status()
-        return r.json()
-    except Exception as e:
-        st.warning(f"TMDB 요청 오류: {endpoint} → {e}")
-        return {}
-
-@st.cache_data(show_spinner=False, ttl=60 * 60)
+def _session_credentials() -> Tuple[str, str]:
+    return (
+        st.session_state.get("TMDB_API_KEY", TMDB_API_KEY),
+        st.session_state.get("TMDB_ACCESS_TOKEN", TMDB_ACCESS_TOKEN),
+    )
+
+def _script_ctx_initializer() -> Optional[Callable[[], None]]:
+    # 워커 스레드에서도 st.session_state(API 키)·st.warning을 쓸 수 있도록 실행 컨텍스트 전달
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return None
+    return lambda: add_script_run_ctx(ctx=ctx)
+
+configure(credentials=_session_credentials, on_error=st.warning, worker_initializer=_script_ctx_initializer)
+
+# 참조 데이터(장르/설정/지역)는 tmdb_cache 정책표에 따라 오래 보관하고, 기간이 지나도
+# 옛 값을 바로 쓰면서 백그라운드에서 갱신 → 사용자 요청이 이 갱신을 기다리는 일이 없음.
+@shared_cache("genre")
 def get_genre_maps() -> Tuple[Dict[int, str], Dict[int, str]]:
     movie = tmdb_request("genre/movie/list", {"language": "ko-KR"}).get("genres", [])
     tv = tmdb_request("genre/tv/list", {"language": "ko-KR"}).get("genres", [])
@@ -63,184 +73,301 @@ def get_genre_maps() -> Tuple[Dict[int, str], Dict[int, str]]:
         {g["id"]: g["name"] for g in tv},
     )
 
-@st.cache_data(show_spinner=False, ttl=60 * 60)
+@shared_cache("configuration")
 def get_configuration() -> dict:
     return tmdb_request("configuration")
 
-@st.cache_data(show_spinner=False, ttl=60 * 60)
+@shared_cache("configuration")
+def get_poster_source() -> Tuple[str, str]:
+    """(이미지 base URL, 카드 폭에 맞는 가장 작은 포스터 크기) — configuration 기준."""
+    images = get_configuration().get("images") or {}
+    base_url = images.get("secure_base_url") or TMDB_IMG
+    return base_url, pick_poster_size(images.get("poster_sizes") or DEFAULT_POSTER_SIZES)
+
+@shared_cache("regions")
 def get_provider_regions() -> List[str]:
     data = tmdb_request("watch/providers/regions").get("results", [])
     # ISO 3166-1 code 목록
     return sorted({x.get("iso_3166_1", "") for x in data if x.get("iso_3166_1")})
 
-# -------------------------------------
-# 심리 → 추천 파이프라인 설정
-# -------------------------------------
+def get_credits(kind: str, tmdb_id: int) -> dict:
+    return get_title_bundle(kind, tmdb_id).get("credits") or {}
 
-MOODS = [
-    "불안", "우울", "스트레스", "외로움", "분노", "무기력",
-    "행복", "호기심", "설렘(로맨틱)", "두려움(스릴)", "위로/힐링", "몰입/도전"
-]
-
-# 각 심리에 연결할 장르/키워드 후보 (가중치 기반)
-MOOD_TO_GENRES = {
-    "불안": {"movie": [53, 9648], "tv": [80, 9648]},          # 스릴러, 미스터리 / 범죄
-    "우울": {"movie": [18, 10749], "tv": [18]},               # 드라마, 로맨스
-    "스트레스": {"movie": [35, 16], "tv": [35, 16]},          # 코미디, 애니
-    "외로움": {"movie": [18, 10749], "tv": [18]},             # 드라마/로맨스
-    "분노": {"movie": [28, 80], "tv": [10759, 80]},           # 액션, 범죄
-    "무기력": {"movie": [12, 14, 878], "tv": [10765, 10759]},# 모험, 판타지, SF / Sci-Fi & Fantasy, 액션&모험
-    "행복": {"movie": [35, 10402], "tv": [35]},              # 코미디, 음악
-    "호기심": {"movie": [99, 36], "tv": [99, 36]},           # 다큐, 역사
-    "설렘(로맨틱)": {"movie": [10749, 35], "tv": [10766, 35]},# 로맨스, 코미디(일일연속극 대체: Soap=10766)
-    "두려움(스릴)": {"movie": [27, 53], "tv": [9648, 80]},     # 공포, 스릴러 / 미스터리
-    "위로/힐링": {"movie": [16, 12, 10751], "tv": [16, 10751]},# 애니, 가족
-    "몰입/도전": {"movie": [18, 28], "tv": [18, 10759]},      # 드라마, 액션&모험
-}
+def get_details(kind: str, tmdb_id: int) -> dict:
+    bundle = get_title_bundle(kind, tmdb_id)
+    return {k: v for k, v in bundle.items() if k not in TITLE_BUNDLE_PARTS}
+
+def get_videos(kind: str, tmdb_id: int) -> List[dict]:
+    results = (get_title_bundle(kind, tmdb_id).get("videos") or {}).get("results", [])
+    # 한글 영상을 우선, 없으면 영어 트레일러라도 사용
+    return sorted(results, key=lambda v: v.get("iso_639_1") != "ko")
+
+
+@st.cache_resource(show_spinner=False)
+def start_cache_warmer(regions: Tuple[str, ...] = WARM_REGIONS) -> Optional[WarmerStatus]:
+    """프로세스당 한 번만 예열 스레드를 띄움 (지역 설정이나 API 키가 없으면 None)."""
+    if not regions or not (TMDB_API_KEY or TMDB_ACCESS_TOKEN):
+        return None
+    profiles = warm_profiles(regions)
+    status = WarmerStatus(len(profiles))
+    threading.Thread(
+        target=warm_caches,
+        args=(profiles, status),
+        name="moodflix-cache-warmer",
+        daemon=True,
+    ).start()
+    return status
 
 # -------------------------------------
-# TMDB 탐색/필터링
+# 성능 지표 (디버그)
 # -------------------------------------
 
-@st.cache_data(show_spinner=False, ttl=60 * 30)
-def discover_titles(kind: str, with_genres: List[int], page: int = 1, language: str = "ko-KR") -> List[dict]:
-    """영화/TV discover 결과 반환."""
-    assert kind in ("movie", "tv")
-    endpoint = f"discover/{kind}"
-    params = {
-        "language": language,
-        "sort_by": "popularity.desc",
-        "include_adult": "false",
-        "page": page,
-    }
-    if with_genres:
-        params["with_genres"] = ",".join(map(str, with_genres))
-    data = tmdb_request(endpoint, params)
-    return data.get("results", [])
+# MOODFLIX_DEBUG=1 이거나 주소에 ?debug=1 을 붙이면 화면 아래에 지표 패널을 보여줌
+METRICS_DEBUG = os.getenv("MOODFLIX_DEBUG", "").lower() in ("1", "true", "yes")
+
+@st.cache_resource(show_spinner=False)
+def start_metrics_exporter() -> Optional[int]:
+    """MOODFLIX_METRICS_PORT가 있으면 /metrics 내보내기 서버를 프로세스당 한 번 띄우고 포트를 반환."""
+    server = start_exporter()
+    return server.server_address[1] if server else None
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else round(seconds * 1000, 1)
+
+def histogram_rows(series: List[dict], label: str) -> List[dict]:
+    return [
+        {
+            label: h["labels"].get(label, "-"),
+            "횟수": h["count"],
+            "평균 ms": _ms(h["avg"]),
+            "p50 ms": _ms(h["p50"]),
+            "p95 ms": _ms(h["p95"]),
+        }
+        for h in series
+    ]
+
+def cache_rows(series: List[dict]) -> List[dict]:
+    """cache_lookups_total을 캐시 이름별 적중/지난 값/실패와 적중률로 묶음."""
+    caches: Dict[str, Dict[str, float]] = {}
+    for c in series:
+        row = caches.setdefault(c["labels"].get("cache", "-"), {"hit": 0, "stale": 0, "miss": 0, "revalidate": 0})
+        row[c["labels"].get("result", "miss")] = row.get(c["labels"].get("result", "miss"), 0) + c["value"]
+    rows = []
+    for name, r in sorted(caches.items()):
+        total = sum(r.values())
+        rows.append({
+            "캐시": name,
+            "적중": int(r["hit"]),
+            "지난 값": int(r["stale"]),
+            "실패": int(r["miss"] + r["revalidate"]),
+            "적중률": f"{(r['hit'] + r['stale']) / total:.0%}" if total else "-",
+        })
+    return rows
+
+@st.fragment
+def metrics_panel() -> None:
+    """TMDB 지연/요청/오류, 캐시 적중, 추천 단계별 시간. 새로고침은 이 패널만 다시 실행."""
+    metrics = get_metrics()
+    snap = metrics.snapshot()
+    counters, histograms = snap["counters"], snap["histograms"]
+
+    top = st.columns([1, 3])
+    top[0].button("🔄 새로고침", key="metrics_refresh")
+    top[1].caption(
+        f"클라이언트: {get_client().stats()}"
+        + (f" · 내보내기: :{metrics_port}/metrics" if metrics_port else "")
+    )
 
-@st.cache_data(show_spinner=False, ttl=60 * 30)
-def get_watch_providers(kind: str, tmdb_id: int) -> dict:
-    return tmdb_request(f"{kind}/{tmdb_id}/watch/providers")
+    st.markdown("**TMDB 요청 지연 (엔드포인트 종류별)**")
+    st.dataframe(histogram_rows(histograms.get("tmdb_request_seconds", []), "family"), use_container_width=True)
 
-@st.cache_data(show_spinner=False, ttl=60 * 60)
-def get_credits(kind: str, tmdb_id: int) -> dict:
-    return tmdb_request(f"{kind}/{tmdb_id}/credits", {"language": "ko-KR"})
+    st.markdown("**추천 단계별 시간**")
+    st.dataframe(histogram_rows(histograms.get("recommendation_stage_seconds", []), "stage"), use_container_width=True)
 
-@st.cache_data(show_spinner=False, ttl=60 * 60)
-def get_details(kind: str, tmdb_id: int) -> dict:
-    return tmdb_request(f"{kind}/{tmdb_id}", {"language": "ko-KR"})
+    st.markdown("**캐시 적중**")
+    st.dataframe(cache_rows(counters.get("cache_lookups_total", [])), use_container_width=True)
 
-@st.cache_data(show_spinner=False, ttl=60 * 60)
-def get_videos(kind: str, tmdb_id: int) -> List[dict]:
-    data = tmdb_request(f"{kind}/{tmdb_id}/videos", {"language": "ko-KR"})
-    results = data.get("results", [])
-    # 한글이 없으면 영어 트레일러라도 추가로 시도
-    if not results:
-        results = tmdb_request(f"{kind}/{tmdb_id}/videos", {"language": "en-US"}).get("results", [])
-    return results
+    st.markdown("**회로 차단기 (엔드포인트 종류별)**")
+    st.dataframe([{"종류": family, **c} for family, c in get_client().circuits().items()], use_container_width=True)
 
-# -------------------------------------
-# Netflix 제공 여부 확인
-# -------------------------------------
+    st.markdown("**요청 / 재시도 / 오류**")
+    st.dataframe(
+        [
+            {"지표": name, **c["labels"], "값": int(c["value"])}
+            for name in ("tmdb_requests_total", "tmdb_retries_total", "tmdb_errors_total", "tmdb_short_circuits_total")
+            for c in counters.get(name, [])
+        ],
+        use_container_width=True,
+    )
 
-def is_on_netflix(provider_data: dict, region: str) -> bool:
-    if not provider_data:
-        return False
-    results = provider_data.get("results", {})
-    if not results or region not in results:
-        return False
-    region_info = results.get(region, {})
-    for key in ("flatrate", "ads", "buy", "rent"):
-        offers = region_info.get(key) or []
-        for o in offers:
-            if o.get("provider_id") == NETFLIX_PROVIDER_ID:
-                return True
-    return False
+    cols = st.columns(2)
+    cols[0].download_button("Prometheus 텍스트", metrics.to_prometheus(), file_name="moodflix_metrics.prom", mime="text/plain")
+    cols[1].download_button("JSON", metrics.to_json(), file_name="moodflix_metrics.json", mime="application/json")
 
 # -------------------------------------
-# 추천 로직
+# 카드 렌더링
 # -------------------------------------
 
-def rank_and_pick(candidates: List[dict], k: int = 12) -> List[dict]:
-    """평점/인기도를 혼합해 간단 랭킹 후 상위 k개 선택."""
-    def score(x):
-        return (x.get("vote_average", 0) * 0.6) + (x.get("popularity", 0) * 0.4)
-    ranked = sorted(candidates, key=score, reverse=True)
-    return ranked[:k]
-
-def build_recommendations(
-    moods: List[str],
-    country: str,
-    include_tv: bool,
-    include_movie: bool,
-    intensity: Dict[str, int],  # 각 무드 강도(1~5)
-    allow_non_netflix: bool,
-    pages: int = 3,
-) -> List[Tuple[str, dict]]:
-    random.seed(42)
-    movie_genres_map, tv_genres_map = get_genre_maps()
-
-    # 요청한 모든 경우 조합 반영: 무드별 장르 집합을 합산(강도 가중치)하여 우선순위 부여
-    movie_genres_weight: Dict[int, int] = {}
-    tv_genres_weight: Dict[int, int] = {}
-
-    for m in moods:
-        mapping = MOOD_TO_GENRES.get(m, {})
-        if include_movie:
-            for gid in mapping.get("movie", []):
-                movie_genres_weight[gid] = movie_genres_weight.get(gid, 0) + max(1, intensity.get(m, 1))
-        if include_tv:
-            for gid in mapping.get("tv", []):
-                tv_genres_weight[gid] = tv_genres_weight.get(gid, 0) + max(1, intensity.get(m, 1))
-
-    def gather(kind: str, genre_weight: Dict[int, int]) -> List[dict]:
-        if not genre_weight:
-            return []
-        # 가중치가 높은 장르부터 차례로 discover 호출
-        ordered = [gid for gid, _ in sorted(genre_weight.items(), key=lambda kv: kv[1], reverse=True)]
-        collected: List[dict] = []
-        for gid in ordered:
-            for p in range(1, pages + 1):
-                items = discover_titles(kind, [gid], page=p)
-                collected.extend(items)
-        # 중복 제거 (id 기반)
-        uniq = { (x.get("id")): x for x in collected }
-        return list(uniq.values())
-
-    all_candidates: List[Tuple[str, dict]] = []
-
-    if include_movie:
-        movies = gather("movie", movie_genres_weight)
-        for m in rank_and_pick(movies, k=60):
-            all_candidates.append(("movie", m))
-    if include_tv:
-        tvs = gather("tv", tv_genres_weight)
-        for t in rank_and_pick(tvs, k=60):
-            all_candidates.append(("tv", t))
-
-    # Netflix 필터링
-    filtered: List[Tuple[str, dict]] = []
-    fallback: List[Tuple[str, dict]] = []
-    for kind, item in all_candidates:
-        providers = get_watch_providers(kind, item["id"]) or {}
-        on_nf = is_on_netflix(providers, country)
-        if on_nf:
-            filtered.append((kind, item))
+CARD_COLUMNS = 3
+# 한 페이지에 보여줄 카드 수 (보이는 카드의 상세만 받음)
+CARDS_PER_PAGE = 6
+
+def card_slots(n: int) -> list:
+    """n개 카드 자리를 CARD_COLUMNS열 그리드로 만들고 각 자리(st.empty)를 순서대로 반환."""
+    slots = []
+    for _ in range((n + CARD_COLUMNS - 1) // CARD_COLUMNS):
+        for col in st.columns(CARD_COLUMNS):
+            if len(slots) < n:
+                slots.append(col.empty())
+    return slots
+
+def card_poster_url(item: dict) -> Optional[str]:
+    poster_path = item.get("poster_path")
+    if not poster_path:
+        return None
+    base_url, size = get_poster_source()
+    return poster_url(poster_path, size, base_url)
+
+def prefetch_posters(items: Iterable[Tuple[str, dict]]) -> None:
+    """포스터를 백그라운드로 로컬 캐시에 받아 둠 (기다리지 않음)."""
+    cache = get_poster_cache()
+    if cache is not None:
+        cache.prefetch(url for url in (card_poster_url(item) for _, item in items) if url)
+
+def render_card_header(kind: str, item: dict) -> None:
+    """포스터/제목/평점: discover 결과만으로 그릴 수 있는 부분."""
+    title = item.get("title") or item.get("name")
+    url = card_poster_url(item)
+    vote = item.get("vote_average", 0)
+
+    # 포스터: 로컬 캐시에 있으면 그 바이트를, 없으면 CDN 주소를 그대로 (다음엔 캐시에서)
+    if url:
+        cache = get_poster_cache()
+        data = cache.get(url) if cache is not None else None
+        if data is None and cache is not None:
+            cache.prefetch([url])
+        st.image(data if data is not None else url, use_column_width=True)
+    else:
+        st.write("(포스터 없음)")
+
+    st.markdown(f"#### {'🎞️' if kind=='movie' else '📺'} {title}")
+    st.caption(f"평점 ★ {vote:.1f} | TMDB ID: {item.get('id')}")
+
+def render_card_placeholder(slot, kind: Optional[str] = None, item: Optional[dict] = None) -> None:
+    """상세가 오기 전 자리 표시: 작품을 모르면 빈 카드, 알면 헤더만."""
+    with slot.container(border=True):
+        if item is None:
+            st.caption("⏳ 추천 작품을 찾는 중…")
+        else:
+            render_card_header(kind, item)
+            st.caption("⏳ 상세 정보를 불러오는 중…")
+
+def render_card(kind: str, item: dict, country: str) -> None:
+    """카드 (줄거리/출연진/제공 여부/트레일러). 세부 정보는 켤 때만 그림."""
+    tmdb_id = item.get("id")
+    render_card_header(kind, item)
+
+    # 상세/출연진
+    details = get_details(kind, tmdb_id) or {}
+    overview = details.get("overview") or item.get("overview") or "줄거리 정보가 아직 없어요."
+    st.write(overview)
+
+    credits = get_credits(kind, tmdb_id) or {}
+    cast = credits.get("cast", [])
+    if cast:
+        top_cast = ", ".join([c.get("name", "") for c in cast[:5]])
+        st.caption(f"👥 출연: {top_cast}")
+
+    # 시청 제공사 표기
+    if netflix_available(kind, tmdb_id, country):
+        st.success(f"✅ 이 작품은 {country} 지역 Netflix에서 제공 중일 가능성이 높아요.")
+    else:
+        st.warning("❌ 현재 지역 Netflix 제공 정보가 없어요 (TMDB 기준).")
+
+    # 트레일러 버튼
+    vids = [v for v in get_videos(kind, tmdb_id) if v.get("site") in ("YouTube", "Vimeo")]
+    if vids:
+        yt = next((v for v in vids if v.get("type") in ("Trailer", "Teaser")), vids[0])
+        key = yt.get("key")
+        site = yt.get("site")
+        if site == "YouTube" and key:
+            st.link_button("▶️ 트레일러 보기 (YouTube)", f"https://www.youtube.com/watch?v={key}")
+        elif site == "Vimeo" and key:
+            st.link_button("▶️ 트레일러 보기 (Vimeo)", f"https://vimeo.com/{key}")
+
+    render_card_details(kind, tmdb_id)
+
+@st.fragment
+def render_card_details(kind: str, tmdb_id: int) -> None:
+    """세부 정보: 켰을 때만 그림 (이 카드 부분만 다시 실행)."""
+    if st.toggle("세부 정보", key=f"details_{kind}_{tmdb_id}"):
+        details = get_details(kind, tmdb_id) or {}
+        if kind == "movie":
+            runtime = details.get("runtime")
+            release = details.get("release_date")
+            genres = ", ".join([g.get("name") for g in details.get("genres", [])])
+            st.write(f"개봉: {release or '-'} | 상영시간: {runtime or '-'}분 | 장르: {genres or '-'}")
         else:
-            fallback.append((kind, item))
+            seasons = details.get("number_of_seasons")
+            episodes = details.get("number_of_episodes")
+            first_air = details.get("first_air_date")
+            last_air = details.get("last_air_date")
+            genres = ", ".join([g.get("name") for g in details.get("genres", [])])
+            st.write(f"방영: {first_air or '-'} ~ {last_air or '-'} | 시즌: {seasons or '-'} | 에피소드: {episodes or '-'} | 장르: {genres or '-'}")
+        nf_regions = netflix_regions(kind, tmdb_id)
+        st.caption(f"🌍 Netflix 제공 국가({len(nf_regions)}): {', '.join(nf_regions) if nf_regions else '정보 없음'}")
+
+@st.fragment
+def results_grid() -> None:
+    """세션에 남겨둔 마지막 추천 결과를 페이지 단위로 표시. 페이지 이동은 이 그리드 부분만 다시 실행."""
+    last = st.session_state.get("last_results") or {}
+    recs: CandidateStore = last.get("recs") or CandidateStore.empty()
+    country = last.get("country", "KR")
+    max_workers = st.session_state.get("opt_max_workers", MAX_CONCURRENT_REQUESTS)
+    progressive = st.session_state.get("opt_progressive", True)
+    page_count = max(1, (len(recs) + CARDS_PER_PAGE - 1) // CARDS_PER_PAGE)
+    page = min(max(0, st.session_state.get("results_page", 0)), page_count - 1)
+    visible = recs[page * CARDS_PER_PAGE:(page + 1) * CARDS_PER_PAGE]
+
+    # 다음 페이지 포스터는 지금 미리 받아 둠
+    prefetch_posters(recs[(page + 1) * CARDS_PER_PAGE:(page + 2) * CARDS_PER_PAGE])
+
+    slots = card_slots(len(visible))
+    if progressive:
+        # 보이는 카드의 상세 묶음만 병렬로 받으며 도착한 카드부터 완성
+        for slot, (kind, item) in zip(slots, visible):
+            render_card_placeholder(slot, kind, item)
+        for i in iter_title_bundles([(kind, item["id"]) for kind, item in visible], max_workers=max_workers):
+            kind, item = visible[i]
+            with slots[i].container(border=True):
+                render_card(kind, item, country)
+    else:
+        for slot, (kind, item) in zip(slots, visible):
+            with slot.container(border=True):
+                render_card(kind, item, country)
 
-    if not filtered and allow_non_netflix:
-        filtered = fallback  # 넷플릭스 없으면 대체로 채우기
+    if page_count > 1:
+        def go(delta: int) -> None:
+            st.session_state["results_page"] = page + delta
 
-    # 최종 12~18개 정도 반환
-    random.shuffle(filtered)
-    return filtered[:18]
+        nav = st.columns([1, 2, 1])
+        nav[0].button("◀ 이전", key="results_prev", disabled=page == 0, on_click=go, args=(-1,))
+        nav[1].caption(f"{page + 1} / {page_count} 페이지")
+        nav[2].button("다음 ▶", key="results_next", disabled=page >= page_count - 1, on_click=go, args=(1,))
 
 # -------------------------------------
 # UI
 # -------------------------------------
 
-with st.sidebar:
+warmer = start_cache_warmer()
+metrics_port = start_metrics_exporter()
+
+# 화면은 독립적으로 다시 실행되는 조각(fragment) 3개로 나뉨: 사이드바 설정 / 무드 패널 / 결과 그리드.
+# 조각 안의 위젯을 만져도 그 조각만 다시 실행되고, 값은 위젯 key로 st.session_state에서 읽음.
+# "추천 보기"만 전체 실행을 일으키며, 결과는 st.session_state["last_results"]에 남아 계속 표시됨.
+
+@st.fragment
+def settings_panel() -> None:
     st.header("🔑 API & 환경 설정")
     api_in = st.text_input("TMDB API Key", value=TMDB_API_KEY, type="password", help=".env에 TMDB_API_KEY로 저장하거나 여기 입력")
     if api_in:
@@ -248,14 +375,49 @@ with st.sidebar:
 
     regions = get_provider_regions()
     default_region = "KR" if "KR" in regions else (regions[0] if regions else "KR")
-    country = st.selectbox("시청 국가 (Netflix 제공 지역)", options=regions or ["KR", "US"], index=(regions.index(default_region) if default_region in regions else 0))
+    st.selectbox("시청 국가 (Netflix 제공 지역)", options=regions or ["KR", "US"], index=(regions.index(default_region) if default_region in regions else 0), key="opt_country")
 
     st.markdown("---")
     st.subheader("⚙️ 추천 옵션")
-    include_movie = st.checkbox("영화 포함", value=True)
-    include_tv = st.checkbox("TV 시리즈 포함", value=True)
-    allow_non_netflix = st.checkbox("넷플릭스에 없으면 대체(비넷플릭스)도 허용", value=False)
-    pages = st.slider("탐색 범위(깊이)", 1, 5, 3, help="클수록 더 많은 후보를 훑어 더 다양한 추천")
+    st.checkbox("영화 포함", value=True, key="opt_include_movie")
+    st.checkbox("TV 시리즈 포함", value=True, key="opt_include_tv")
+    st.checkbox("넷플릭스에 없으면 대체(비넷플릭스)도 허용", value=False, key="opt_allow_non_netflix")
+    st.slider("탐색 범위(깊이)", 1, 5, 3, help="클수록 더 많은 후보를 훑어 더 다양한 추천", key="opt_pages")
+    st.checkbox("Netflix 필터를 TMDB 검색 단계에서 적용", value=True, help="끄면 후보마다 제공사 정보를 따로 조회해 확인 (요청 수가 크게 늘어남)", key="opt_server_filter")
+    st.checkbox("카드 점진 표시", value=True, help="찾는 즉시 카드 자리를 보여주고 상세가 도착하는 대로 채움", key="opt_progressive")
+    if get_snapshot() is not None:
+        st.checkbox("오프라인 스냅샷으로 추천", value=False, help="snapshot.py로 미리 받아둔 데이터만 사용 (TMDB 호출 없음)", key="opt_use_snapshot")
+    st.slider("동시 요청 수", 1, 32, min(MAX_CONCURRENT_REQUESTS, 32), help="제공사 확인을 병렬로 보낼 최대 요청 수 (레이트 리밋이 걸리면 낮춰주세요)", key="opt_max_workers")
+
+    if warmer is not None:
+        st.markdown("---")
+        st.caption(f"🔥 캐시 예열 ({', '.join(WARM_REGIONS)}): {warmer.done}/{warmer.total}" + (f" · 실패 {warmer.failed}" if warmer.failed else ""))
+        if warmer.running:
+            st.progress(warmer.done / max(1, warmer.total))
+
+def selected_mood_profile() -> Tuple[List[str], Dict[str, int]]:
+    """무드 패널 위젯 상태에서 (선택 무드, 강도)를 읽음. 아무것도 없으면 기본 추천 무드."""
+    moods = [mood for i, mood in enumerate(MOODS) if st.session_state.get(f"m_{i}")]
+    if not moods:
+        return list(DEFAULT_MOODS), {m: 3 for m in DEFAULT_MOODS}
+    return moods, {mood: st.session_state.get(f"s_{i}", 3) for i, mood in enumerate(MOODS) if mood in moods}
+
+@st.fragment
+def mood_panel() -> None:
+    cols = st.columns(4)
+    any_on = False
+    for i, mood in enumerate(MOODS):
+        with cols[i % 4]:
+            if st.toggle(f"{mood}", key=f"m_{i}"):
+                any_on = True
+                st.slider(f"{mood} 강도", 1, 5, 3, key=f"s_{i}")
+
+    # 모든 경우의 수: 아무것도 선택하지 않아도 동작하도록 기본값 제공
+    if not any_on:
+        st.info("무드를 하나도 선택하지 않으셨어요. 기본 추천(지금 인기 콘텐츠)으로 보여드릴게요 ✨")
+
+with st.sidebar:
+    settings_panel()
 
 st.title("🎬 MoodFlix")
 st.caption("나의 지금 심리 상태를 바탕으로 Netflix에서 볼만한 작품을 추천해드려요.")
@@ -265,21 +427,7 @@ st.markdown("""
 아래 문항을 선택하면 해당 무드(감정) 강도를 반영해 작품을 고릅니다. (모두 복수 선택 가능)
 """)
 
-cols = st.columns(4)
-selected_moods: List[str] = []
-intensity: Dict[str, int] = {}
-for i, mood in enumerate(MOODS):
-    with cols[i % 4]:
-        on = st.toggle(f"{mood}", key=f"m_{i}")
-        if on:
-            selected_moods.append(mood)
-            intensity[mood] = st.slider(f"{mood} 강도", 1, 5, 3, key=f"s_{i}")
-
-# 모든 경우의 수: 아무것도 선택하지 않아도 동작하도록 기본값 제공
-if not selected_moods:
-    st.info("무드를 하나도 선택하지 않으셨어요. 기본 추천(지금 인기 콘텐츠)으로 보여드릴게요 ✨")
-    selected_moods = ["행복", "호기심"]
-    intensity = {"행복": 3, "호기심": 3}
+mood_panel()
 
 run = st.button("🔍 추천 보기")
 
@@ -288,93 +436,80 @@ if run:
         st.error("TMDB API Key가 필요해요. 사이드바에 입력해주세요.")
         st.stop()
 
-    with st.spinner("당신의 무드에 딱 맞는 작품을 찾는 중…"):
-        recs = build_recommendations(
-            moods=selected_moods,
-            country=country,
-            include_tv=include_tv,
-            include_movie=include_movie,
-            intensity=intensity,
-            allow_non_netflix=allow_non_netflix,
-            pages=pages,
-        )
-
-    if not recs:
+    selected_moods, intensity = selected_mood_profile()
+    country = st.session_state["opt_country"]
+    max_workers = st.session_state["opt_max_workers"]
+    progressive = st.session_state["opt_progressive"]
+    profile = recommendation_profile(
+        moods=selected_moods,
+        country=country,
+        include_tv=st.session_state["opt_include_tv"],
+        include_movie=st.session_state["opt_include_movie"],
+        intensity=intensity,
+        allow_non_netflix=st.session_state["opt_allow_non_netflix"],
+        pages=st.session_state["opt_pages"],
+        server_filter=st.session_state["opt_server_filter"],
+        use_snapshot=st.session_state.get("opt_use_snapshot", False),
+    )
+
+    started = time.perf_counter()
+    timing = ""
+    if progressive:
+        # 첫 페이지 자리(스켈레톤)부터 그리고, 찾는 대로 미리보기로 채움
+        search_area = st.empty()
+        with search_area.container():
+            st.subheader("🎯 추천 결과")
+            status_line = st.empty()
+            slots = card_slots(CARDS_PER_PAGE)
+            for slot in slots:
+                render_card_placeholder(slot)
+        first_card: List[float] = []
+
+        def show_partial(found: CandidateStore) -> None:
+            for slot, (kind, item) in zip(slots, found[:CARDS_PER_PAGE]):
+                render_card_placeholder(slot, kind, item)
+            if not first_card:
+                first_card.append(time.perf_counter() - started)
+            status_line.caption(f"찾는 중… 지금까지 {len(found)}편 발견")
+
+        recs = get_recommendations(profile, max_workers=max_workers, on_progress=show_partial)
+        search_area.empty()
+        if first_card:
+            timing = f"⏱️ 첫 카드 {first_card[0]:.2f}초"
+    else:
+        with st.spinner("당신의 무드에 딱 맞는 작품을 찾는 중…"):
+            recs = get_recommendations(profile, max_workers=max_workers)
+
+    st.session_state["last_results"] = {
+        "recs": recs,
+        "moods": selected_moods,
+        "country": country,
+        "timing": timing,
+        "started": started,
+    }
+    st.session_state["results_page"] = 0
+
+open_circuits = get_client().open_circuits()
+if open_circuits:
+    st.warning(f"TMDB 응답이 불안정해서 잠시 캐시된 데이터로만 추천해요 ({', '.join(open_circuits)}). 결과가 적을 수 있어요.")
+
+if "last_results" in st.session_state:
+    last = st.session_state["last_results"]
+    if not last["recs"]:
         st.warning("조건에 맞는 작품을 찾지 못했어요. 옵션을 넓혀보거나 '대체 허용'을 켜보세요.")
     else:
         st.subheader("🎯 추천 결과")
-        st.caption(f"선택 무드: {', '.join(selected_moods)} | 국가: {country} | 작품 수: {len(recs)}")
-
-        # 카드 그리드
-        ncol = 3
-        rows = (len(recs) + ncol - 1) // ncol
-        for r in range(rows):
-            ccols = st.columns(ncol)
-            for ci in range(ncol):
-                idx = r * ncol + ci
-                if idx >= len(recs):
-                    continue
-                kind, item = recs[idx]
-                title = item.get("title") or item.get("name")
-                poster_path = item.get("poster_path")
-                vote = item.get("vote_average", 0)
-                tmdb_id = item.get("id")
-
-                with ccols[ci]:
-                    with st.container(border=True):
-                        # 포스터
-                        if poster_path:
-                            st.image(f"{TMDB_IMG}w500{poster_path}", use_column_width=True)
-                        else:
-                            st.write("(포스터 없음)")
-
-                        st.markdown(f"#### {'🎞️' if kind=='movie' else '📺'} {title}")
-                        st.caption(f"평점 ★ {vote:.1f} | TMDB ID: {tmdb_id}")
-
-                        # 상세/출연진
-                        details = get_details(kind, tmdb_id) or {}
-                        overview = details.get("overview") or item.get("overview") or "줄거리 정보가 아직 없어요."
-                        st.write(overview)
-
-                        credits = get_credits(kind, tmdb_id) or {}
-                        cast = credits.get("cast", [])
-                        if cast:
-                            top_cast = ", ".join([c.get("name", "") for c in cast[:5]])
-                            st.caption(f"👥 출연: {top_cast}")
-
-                        # 시청 제공사 표기
-                        providers = get_watch_providers(kind, tmdb_id) or {}
-                        on_nf = is_on_netflix(providers, country)
-                        if on_nf:
-                            st.success(f"✅ 이 작품은 {country} 지역 Netflix에서 제공 중일 가능성이 높아요.")
-                        else:
-                            st.warning("❌ 현재 지역 Netflix 제공 정보가 없어요 (TMDB 기준).")
-
-                        # 트레일러 버튼
-                        vids = [v for v in get_videos(kind, tmdb_id) if v.get("site") in ("YouTube", "Vimeo")]
-                        if vids:
-                            yt = next((v for v in vids if v.get("type") in ("Trailer", "Teaser")), vids[0])
-                            key = yt.get("key")
-                            site = yt.get("site")
-                            if site == "YouTube" and key:
-                                st.link_button("▶️ 트레일러 보기 (YouTube)", f"https://www.youtube.com/watch?v={key}")
-                            elif site == "Vimeo" and key:
-                                st.link_button("▶️ 트레일러 보기 (Vimeo)", f"https://vimeo.com/{key}")
-
-                        # 세부 정보 토글
-                        with st.expander("세부 정보"):
-                            if kind == "movie":
-                                runtime = details.get("runtime")
-                                release = details.get("release_date")
-                                genres = ", ".join([g.get("name") for g in details.get("genres", [])])
-                                st.write(f"개봉: {release or '-'} | 상영시간: {runtime or '-'}분 | 장르: {genres or '-'}")
-                            else:
-                                seasons = details.get("number_of_seasons")
-                                episodes = details.get("number_of_episodes")
-                                first_air = details.get("first_air_date")
-                                last_air = details.get("last_air_date")
-                                genres = ", ".join([g.get("name") for g in details.get("genres", [])])
-                                st.write(f"방영: {first_air or '-'} ~ {last_air or '-'} | 시즌: {seasons or '-'} | 에피소드: {episodes or '-'} | 장르: {genres or '-'}")
+        status_line = st.empty()
+        results_grid()
+        summary = f"선택 무드: {', '.join(last['moods'])} | 국가: {last['country']} | 작품 수: {len(last['recs'])}"
+        if run and st.session_state["opt_progressive"]:
+            first_page = time.perf_counter() - last["started"]
+            summary += f" | {last['timing'] or '⏱️'} · 첫 페이지 {first_page:.2f}초"
+        status_line.caption(summary)
+
+if METRICS_DEBUG or st.query_params.get("debug") == "1":
+    with st.expander("🛠️ 성능 지표 (디버그)"):
+        metrics_panel()
 
 # 푸터
 st.markdown("""
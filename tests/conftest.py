@@ -0,0 +1,12 @@
+# tests/conftest.py
+# - 저장소 루트 모듈(engine, ranking 등)을 불러올 수 있게 경로 추가.
+# - 디스크 캐시/스냅샷을 끄고 import 시점에 읽는 환경변수를 고정 (실제 TMDB나 로컬 파일을 건드리지 않음).
+
+import os
+import sys
+
+os.environ["TMDB_CACHE_PATH"] = ""
+os.environ["MOODFLIX_SNAPSHOT_PATH"] = os.path.join(os.path.dirname(__file__), "no-snapshot.sqlite3")
+os.environ["MOODFLIX_WARM_REGIONS"] = ""
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
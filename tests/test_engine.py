@@ -0,0 +1,100 @@
+# tests/test_engine.py
+# - build_recommendations 최종 결과에 무드 장르 가중치가 반영되는지 확인 (discover는 가짜 응답).
+# - JSON 프로필/HTTP 요청의 잘못된 값 거절.
+
+import http.client
+import threading
+from typing import List, Optional
+
+import pytest
+
+import engine
+from ranking import CandidateStore
+
+
+def _title(tmdb_id: int, genre: int) -> dict:
+    # 장르만 다르고 평점/투표 수/인기도는 모두 같음 → 점수 차이는 장르 가중치에서만 나옴
+    return {"id": tmdb_id, "title": f"T{tmdb_id}", "genre_ids": [genre], "vote_average": 7.0, "vote_count": 500, "popularity": 50.0}
+
+
+@pytest.fixture
+def fake_discover(monkeypatch):
+    """페이지마다 20편: 절반은 코미디(35), 절반은 다큐(99)."""
+    def discover_titles(kind: str, with_genres: List[int], page: int = 1, language: str = "ko-KR",
+                        watch_region: Optional[str] = None, match_any: bool = False) -> CandidateStore:
+        base = page * 1000 + with_genres[0] * 10_000
+        return CandidateStore.from_items(kind, [_title(base + i, 35 if i % 2 else 99) for i in range(20)])
+
+    monkeypatch.setattr(engine, "discover_titles", discover_titles)
+
+
+def test_higher_weighted_genre_wins_in_final_results(fake_discover):
+    # 행복(코미디 35, 음악 10402) 강도 5 vs 호기심(다큐 99, 역사 36) 강도 1
+    recs = engine.build_recommendations(
+        moods=["행복", "호기심"],
+        country="KR",
+        include_tv=False,
+        include_movie=True,
+        intensity={"행복": 5, "호기심": 1},
+        allow_non_netflix=False,
+        pages=3,
+    )
+    assert len(recs) == engine.RESULT_SIZE
+    assert all(item["genre_ids"] == [35] for _, item in recs)
+
+
+def test_weights_flip_when_intensity_flips(fake_discover):
+    recs = engine.build_recommendations(
+        moods=["행복", "호기심"],
+        country="KR",
+        include_tv=False,
+        include_movie=True,
+        intensity={"행복": 1, "호기심": 5},
+        allow_non_netflix=False,
+        pages=3,
+    )
+    assert recs and all(item["genre_ids"] == [99] for _, item in recs)
+
+
+@pytest.mark.parametrize("key", ["include_movie", "include_tv", "allow_non_netflix"])
+def test_profile_flags_must_be_json_bools(key):
+    # bool("false")는 참이므로 문자열/숫자는 그대로 받지 않음
+    for value in ("false", 0, None):
+        with pytest.raises(ValueError):
+            engine.profile_from_dict({key: value})
+    assert engine.profile_from_dict({"include_tv": False}).include_tv is False
+
+
+@pytest.mark.parametrize("length", ["abc", "-5"])
+def test_server_rejects_bad_content_length(length):
+    server = engine.make_server(port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        conn = http.client.HTTPConnection(*server.server_address, timeout=5)
+        conn.putrequest("POST", "/recommend")
+        conn.putheader("Content-Length", length)
+        conn.endheaders()
+        response = conn.getresponse()
+        response.read()
+        conn.close()
+        assert response.status == 400
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_empty_result_is_not_shared(monkeypatch, fake_discover):
+    # 잘못된 키 등으로 TMDB가 빈 응답만 줄 때의 결과가 공유 결과 캐시에 남으면 안 됨
+    working = engine.discover_titles
+    monkeypatch.setattr(engine, "discover_titles", lambda kind, *args, **kwargs: CandidateStore.empty())
+    engine.get_result_cache().clear()
+    profile = engine.recommendation_profile(
+        moods=["행복"], country="KR", include_tv=False, include_movie=True,
+        intensity={"행복": 3}, allow_non_netflix=False,
+    )
+    assert len(engine.get_recommendations(profile)) == 0
+
+    monkeypatch.setattr(engine, "discover_titles", working)
+    assert len(engine.get_recommendations(profile)) == engine.RESULT_SIZE
+    engine.get_result_cache().clear()
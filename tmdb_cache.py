@@ -0,0 +1,543 @@
+# tmdb_cache.py
+# - TMDB 응답을 디스크(SQLite)에 저장하는 영구 캐시.
+# - Streamlit 재시작/재배포, st.cache_data.clear() 후에도 남아 있어 콜드 스타트를 줄여줌.
+# - ETag/Last-Modified를 함께 저장 → 오래된 항목은 조건부 요청(304)으로 재검증.
+# - 전체 크기 상한을 넘으면 가장 오래 안 쓴 항목부터 삭제(LRU).
+# - WAL 모드 + busy timeout으로 같은 호스트의 여러 프로세스가 한 파일을 같이 써도 안전.
+# - 메모리 쪽에는 세션끼리 같은 객체를 나눠 쓰는 공유 캐시(shared_cache)도 둠: 복사 없이, 전체 바이트 예산 안에서 LRU.
+# - 신선도는 엔드포인트 종류별 정책표(FRESHNESS_POLICIES) 한 곳에서 정함.
+#   신선 기간이 지나도 허용 기간 안이면 일단 옛 값을 돌려주고 백그라운드에서 새로 받음(stale-while-revalidate).
+
+import functools
+import os
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, NamedTuple, Optional, Set, Tuple, TypeVar
+from urllib.parse import parse_qs, urlencode
+
+from metrics import get_metrics
+
+# 캐시 파일 위치 (빈 문자열이면 디스크 캐시 끔)
+CACHE_PATH = os.getenv("TMDB_CACHE_PATH", os.path.join(".tmdb_cache", "tmdb.sqlite3"))
+# 재검증 없이 바로 쓰는 기간(초)
+CACHE_MAX_AGE = int(os.getenv("TMDB_CACHE_MAX_AGE", str(60 * 30)))
+# 디스크 사용 상한(바이트)
+CACHE_MAX_BYTES = int(os.getenv("TMDB_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# 프로세스 공용 메모리 캐시(shared_cache)의 전체 바이트 예산
+SHARED_CACHE_MAX_BYTES = int(os.getenv("TMDB_SHARED_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# 빈 응답(오류 포함)은 짧게만 보관: 일시 장애가 정책 기간 내내 남지 않도록
+EMPTY_RESULT_TTL = 60
+
+# 캐시 키에서 빼는 인증 파라미터
+CREDENTIAL_PARAMS = ("api_key",)
+
+# 접근 시각 갱신 최소 간격(초): 읽을 때마다 쓰기가 생기지 않도록
+_TOUCH_INTERVAL = 60
+
+
+class CacheEntry(NamedTuple):
+    body: str
+    etag: str
+    last_modified: str
+    stored_at: float
+
+    def age(self) -> float:
+        return time.time() - self.stored_at
+
+
+class FreshnessPolicy(NamedTuple):
+    fresh_for: float    # 이 기간(초) 안이면 그대로 사용
+    stale_for: float    # 신선 기간이 지난 뒤 이 기간(초)까지는 옛 값을 주고 백그라운드 재검증 (0이면 기다려서 새로 받음)
+
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+# 엔드포인트 종류별 신선도 정책
+FRESHNESS_POLICIES: Dict[str, FreshnessPolicy] = {
+    # 거의 안 바뀌는 참조 데이터: 하루 신선, 한 달까지는 옛 값으로 즉시 응답
+    "genre": FreshnessPolicy(DAY, 30 * DAY),
+    "configuration": FreshnessPolicy(DAY, 30 * DAY),
+    "regions": FreshnessPolicy(DAY, 30 * DAY),
+    # 인기순/제공사는 자주 바뀜: 30분 신선, 몇 시간까지는 옛 값 + 백그라운드 갱신
+    "discover": FreshnessPolicy(30 * 60, 6 * HOUR),
+    "title": FreshnessPolicy(30 * 60, 6 * HOUR),
+    # 제공사 정보(append_to_response=watch/providers로 받은 작품 묶음 포함)는 옛 값을 덜 오래 씀
+    "providers": FreshnessPolicy(30 * 60, 2 * HOUR),
+    # 변경 목록은 최신이어야 의미가 있음
+    "changes": FreshnessPolicy(10 * 60, 0),
+    "default": FreshnessPolicy(CACHE_MAX_AGE, 0),
+}
+
+
+def endpoint_family(endpoint: str) -> str:
+    """엔드포인트 경로(또는 cache_key)를 정책표의 종류 이름으로.
+    cache_key처럼 쿼리가 붙어 있고 append_to_response에 watch/providers가 있으면 제공사 정책을 따름."""
+    path, _, query = endpoint.partition("?")
+    parts = path.strip("/").split("/")
+    head = parts[0]
+    if head in ("genre", "discover"):
+        return head
+    if head == "configuration":
+        return "regions" if parts[1:] == ["countries"] else "configuration"
+    if head == "watch":
+        return "regions"
+    if head in ("movie", "tv") and len(parts) >= 2:
+        if parts[1] == "changes":
+            return "changes"
+        if "watch" in parts[2:]:
+            return "providers"
+        appended = ",".join(parse_qs(query).get("append_to_response", []))
+        if "watch/providers" in appended.split(","):
+            return "providers"
+        return "title"
+    return "default"
+
+
+def freshness_policy(family: str) -> FreshnessPolicy:
+    return FRESHNESS_POLICIES.get(family, FRESHNESS_POLICIES["default"])
+
+
+def cache_key(endpoint: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """엔드포인트 + 정렬된 파라미터(인증 값 제외)로 만든 정규화 키."""
+    items = sorted(
+        (str(k), str(v)) for k, v in (params or {}).items()
+        if k not in CREDENTIAL_PARAMS and v is not None
+    )
+    path = endpoint.strip("/")
+    return f"{path}?{urlencode(items)}" if items else path
+
+
+class DiskCache:
+    """SQLite 기반 응답 캐시. 스레드마다 연결을 따로 열어 씀."""
+
+    def __init__(self, path: str = CACHE_PATH, max_bytes: int = CACHE_MAX_BYTES, max_age: float = CACHE_MAX_AGE):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        # 다른 프로세스가 동시에 처음 여는 경우에도 표/트리거/합계 행이 한 번에 만들어지도록 잠금
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    body BLOB NOT NULL,
+                    etag TEXT NOT NULL DEFAULT '',
+                    last_modified TEXT NOT NULL DEFAULT '',
+                    stored_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    size INTEGER NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed_at)")
+            # 저장할 때마다 SUM(size)를 세지 않도록 전체 바이트 합계를 한 행에 둠.
+            # 트리거가 같은 트랜잭션 안에서 갱신하므로 파일을 같이 쓰는 모든 프로세스가 같은 합계를 봄
+            conn.execute("CREATE TABLE IF NOT EXISTS responses_total (id INTEGER PRIMARY KEY CHECK (id = 0), bytes INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO responses_total VALUES (0, (SELECT COALESCE(SUM(size), 0) FROM responses))")
+            conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS responses_total_insert AFTER INSERT ON responses "
+                "BEGIN UPDATE responses_total SET bytes = bytes + new.size WHERE id = 0; END"
+            )
+            conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS responses_total_update AFTER UPDATE OF size ON responses "
+                "BEGIN UPDATE responses_total SET bytes = bytes + new.size - old.size WHERE id = 0; END"
+            )
+            conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS responses_total_delete AFTER DELETE ON responses "
+                "BEGIN UPDATE responses_total SET bytes = bytes - old.size WHERE id = 0; END"
+            )
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        try:
+            conn = self._conn()
+            row = conn.execute(
+                "SELECT body, etag, last_modified, stored_at, accessed_at FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            body, etag, last_modified, stored_at, accessed_at = row
+            now = time.time()
+            if now - accessed_at > _TOUCH_INTERVAL:
+                conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            return CacheEntry(zlib.decompress(body).decode("utf-8"), etag, last_modified, stored_at)
+        except (sqlite3.Error, zlib.error):
+            return None
+
+    def _policy(self, key: str) -> FreshnessPolicy:
+        family = endpoint_family(key)
+        if family == "default":
+            return FreshnessPolicy(self.max_age, 0)
+        return freshness_policy(family)
+
+    def is_fresh(self, entry: CacheEntry, key: str = "") -> bool:
+        return entry.age() < self._policy(key).fresh_for
+
+    def is_servable_stale(self, entry: CacheEntry, key: str = "") -> bool:
+        """신선하진 않지만 재검증을 기다리지 않고 먼저 내줘도 되는지."""
+        policy = self._policy(key)
+        return entry.age() < policy.fresh_for + policy.stale_for
+
+    def put(self, key: str, body: str, etag: str = "", last_modified: str = "") -> None:
+        blob = zlib.compress(body.encode("utf-8"))
+        now = time.time()
+        try:
+            conn = self._conn()
+            # INSERT OR REPLACE는 지워지는 옛 행에 삭제 트리거가 돌지 않으므로 UPSERT로 갱신
+            conn.execute(
+                "INSERT INTO responses (key, body, etag, last_modified, stored_at, accessed_at, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET body = excluded.body, etag = excluded.etag, "
+                "last_modified = excluded.last_modified, stored_at = excluded.stored_at, "
+                "accessed_at = excluded.accessed_at, size = excluded.size",
+                (key, blob, etag or "", last_modified or "", now, now, len(blob)),
+            )
+            if self.total_bytes() > self.max_bytes:
+                self._evict()
+        except sqlite3.Error:
+            pass
+
+    def touch(self, key: str) -> None:
+        """304 재검증 성공: 저장 시각을 갱신해 다시 fresh로 만듦."""
+        now = time.time()
+        try:
+            self._conn().execute(
+                "UPDATE responses SET stored_at = ?, accessed_at = ? WHERE key = ?", (now, now, key)
+            )
+        except sqlite3.Error:
+            pass
+
+    def total_bytes(self) -> int:
+        """파일 전체(모든 프로세스가 쓴 몫)의 압축 본문 바이트 합계."""
+        return self._conn().execute("SELECT bytes FROM responses_total WHERE id = 0").fetchone()[0]
+
+    def _evict(self) -> None:
+        conn = self._conn()
+        # 상한의 90%까지 내려가도록 오래 안 쓴 항목부터 삭제 (다른 프로세스와 겹치지 않게 잠금)
+        target = int(self.max_bytes * 0.9)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # 잠금을 기다리는 사이 다른 프로세스가 이미 정리했을 수 있으므로 다시 확인
+            total = self.total_bytes()
+            doomed = []
+            if total > self.max_bytes:
+                for key, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+                    if total <= target:
+                        break
+                    doomed.append((key,))
+                    total -= size
+            conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+
+    def clear(self) -> None:
+        try:
+            self._conn().execute("DELETE FROM responses")
+        except sqlite3.Error:
+            pass
+
+
+class MemoryCache:
+    """프로세스 메모리 LRU + TTL 캐시 (스레드 안전).
+
+    st.cache_data와 달리 값을 복사하지 않고 같은 객체를 돌려주므로, 꺼낸 값은 수정하지 말 것.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = CACHE_MAX_AGE):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if time.time() - stored_at > self.ttl:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.time(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def has_data(value: Any) -> bool:
+    """빈 응답(오류 시 {}·[])이 아닌지. 튜플은 묶음으로 보고 하나라도 차 있으면 True."""
+    if isinstance(value, tuple):
+        return any(has_data(v) for v in value)
+    return bool(value)
+
+
+def deep_sizeof(obj: Any) -> int:
+    """dict/list/tuple/str·슬롯 객체 등으로 이뤄진 값이 차지하는 메모리(바이트) 추정. 공유된 하위 객체는 한 번만 셈."""
+    seen = set()
+    total = 0
+    stack = [obj]
+    while stack:
+        o = stack.pop()
+        if id(o) in seen:
+            continue
+        seen.add(id(o))
+        total += sys.getsizeof(o)
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            stack.extend(o)
+        elif hasattr(o, "__slots__"):
+            # 열 단위 저장소(ranking.CandidateStore 등)는 슬롯 속 배열·목록까지 셈
+            stack.extend(getattr(o, name) for name in o.__slots__ if hasattr(o, name))
+    return total
+
+
+class SharedCache:
+    """세션/스레드가 같은 객체를 나눠 쓰는 메모리 캐시 (항목별 TTL + 전체 바이트 예산 LRU).
+
+    st.cache_data는 저장할 때 pickle, 꺼낼 때마다 복사본을 만들어 세션 수만큼 메모리가 늘지만,
+    여기서는 한 벌만 두고 참조를 그대로 돌려줌. 꺼낸 값은 읽기 전용으로 다룰 것.
+    """
+
+    def __init__(self, max_bytes: int = SHARED_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        # key → (신선 만료 시각, 사용 가능 만료 시각, 크기, 값)
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._refreshing: Set[Hashable] = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.refreshes = 0
+
+    def lookup(self, key: Hashable) -> Tuple[Optional[Any], bool]:
+        """(값, 신선 기간이 지났는지). 없거나 허용 기간까지 지났으면 (None, False)."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, False
+            fresh_until, usable_until, size, value = entry
+            now = time.time()
+            if now > usable_until:
+                del self._data[key]
+                self._bytes -= size
+                self.misses += 1
+                return None, False
+            self._data.move_to_end(key)
+            stale = now > fresh_until
+            if stale:
+                self.stale_hits += 1
+            else:
+                self.hits += 1
+            return value, stale
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """신선한 값만 (지난 값은 None)."""
+        value, stale = self.lookup(key)
+        return None if stale else value
+
+    def put(self, key: Hashable, value: Any, ttl: float, stale_for: float = 0) -> None:
+        size = deep_sizeof(value)
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._data[key] = (now + ttl, now + ttl + stale_for, size, value)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, _, evicted, _) = self._data.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    def refresh_async(self, key: Hashable, load: Callable[[], Any], ttl: float, stale_for: float) -> None:
+        """백그라운드 스레드로 새 값을 받아 교체 (같은 키는 한 번에 하나만).
+
+        새로 받은 값이 비어 있으면(오류) 옛 값을 그대로 두고, 다음 조회 때 다시 시도.
+        """
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            self.refreshes += 1
+
+        def run() -> None:
+            try:
+                value = load()
+                if has_data(value):
+                    self.put(key, value, ttl, stale_for)
+            except Exception:
+                pass
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=run, name="shared-cache-refresh", daemon=True).start()
+
+    def discard(self, prefix: tuple) -> None:
+        """키가 prefix로 시작하는 항목 삭제 (함수 하나의 캐시 비우기)."""
+        with self._lock:
+            for key in [k for k in self._data if k[:len(prefix)] == prefix]:
+                self._bytes -= self._data.pop(key)[2]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "refreshes": self.refreshes,
+            }
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+_shared: Optional[SharedCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_cache() -> SharedCache:
+    """프로세스 공용 메모리 캐시 (모든 세션·워커 스레드가 같은 예산을 나눠 씀)."""
+    global _shared
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = SharedCache()
+    return _shared
+
+
+def _hashable(value: Any) -> Hashable:
+    if isinstance(value, (list, tuple)):
+        return tuple(_hashable(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _hashable(v)) for k, v in value.items()))
+    return value
+
+
+F = TypeVar("F", bound=Callable[..., Any])
+Loader = Callable[[], Any]
+
+# 백그라운드 갱신에 조회한 쪽의 상태(예: 세션 인증 정보)를 넘겨주는 함수들.
+# 조회한 스레드에서 load를 받아, 갱신 스레드에서도 같은 상태로 실행되는 load를 돌려줌.
+_refresh_binders: List[Callable[[Loader], Loader]] = []
+
+
+def add_refresh_binder(binder: Callable[[Loader], Loader]) -> None:
+    """shared_cache의 백그라운드 갱신 전에 적용할 binder 등록 (같은 함수는 한 번만)."""
+    if binder not in _refresh_binders:
+        _refresh_binders.append(binder)
+
+
+def bind_refresh(load: Loader) -> Loader:
+    for binder in _refresh_binders:
+        load = binder(load)
+    return load
+
+
+def shared_cache(family: str) -> Callable[[F], F]:
+    """함수 결과를 공용 SharedCache에 보관하는 데코레이터 (st.cache_data 대신, 복사 없음).
+
+    보관 기간은 FRESHNESS_POLICIES[family]: 신선 기간이 지난 값은 바로 돌려주고 백그라운드에서 갱신,
+    허용 기간까지 지났거나 처음이면 기다려서 받음. 빈 결과는 EMPTY_RESULT_TTL만 보관.
+    키는 모듈·함수 이름 + 인자라서 Streamlit이 스크립트를 다시 실행해 함수가 새로 정의돼도 이어서 씀.
+    """
+    policy = freshness_policy(family)
+
+    def decorate(fn: F) -> F:
+        namespace = (fn.__module__, fn.__qualname__)
+        metrics = get_metrics()
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            cache = get_shared_cache()
+            key = namespace + (_hashable(args), _hashable(kwargs))
+            value, stale = cache.lookup(key)
+            metrics.inc("cache_lookups_total", cache=fn.__qualname__, result="miss" if value is None else "stale" if stale else "hit")
+            if value is None:
+                value = fn(*args, **kwargs)
+                if has_data(value):
+                    cache.put(key, value, policy.fresh_for, policy.stale_for)
+                else:
+                    cache.put(key, value, min(EMPTY_RESULT_TTL, policy.fresh_for))
+            elif stale:
+                # 갱신 스레드에는 Streamlit 실행 컨텍스트가 없으므로 조회 시점의 상태를 붙잡아 넘김
+                cache.refresh_async(key, bind_refresh(lambda: fn(*args, **kwargs)), policy.fresh_for, policy.stale_for)
+            return value
+
+        wrapper.clear = lambda: get_shared_cache().discard(namespace)  # type: ignore[attr-defined]
+        return wrapper  # type: ignore[return-value]
+
+    return decorate
+
+
+_cache: Optional[DiskCache] = None
+_cache_disabled = not CACHE_PATH
+_cache_lock = threading.Lock()
+
+
+def get_disk_cache() -> Optional[DiskCache]:
+    """프로세스 공용 디스크 캐시 (TMDB_CACHE_PATH가 비어 있거나 열 수 없으면 None)."""
+    global _cache, _cache_disabled
+    if _cache is None and not _cache_disabled:
+        with _cache_lock:
+            if _cache is None and not _cache_disabled:
+                try:
+                    _cache = DiskCache()
+                except (OSError, sqlite3.Error):
+                    _cache_disabled = True
+    return _cache
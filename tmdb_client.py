@@ -0,0 +1,635 @@
+# tmdb_client.py
+# - test.py / app.py가 함께 쓰는 TMDB 요청 클라이언트.
+# - requests.Session 하나를 프로세스 전체에서 재사용 → keep-alive로 TLS 핸드셰이크 절약.
+# - 커넥션 풀 크기 조절 가능, gzip 응답, v3(api_key)/v4(Bearer) 인증, 429/5xx 재시도.
+# - 동일한 요청이 동시에 여러 개 들어오면 하나만 보내고 결과를 공유(single-flight).
+# - 프로세스 공용 토큰 버킷으로 초당 요청 수 제한, Retry-After를 따르는 지수 백오프(지터 포함).
+# - 디스크 캐시(tmdb_cache)가 켜져 있으면 응답을 저장하고 ETag/Last-Modified로 재검증.
+# - 엔드포인트 종류별 지연/요청/재시도/오류, 디스크 캐시 적중, 합쳐진 호출·속도 제한·옛 값 응답 수를 metrics에 기록.
+# - 엔드포인트 종류별 회로 차단기: 연속 실패하면 잠시 요청을 보내지 않고 캐시(없으면 빈 값)로 바로 응답,
+#   cooldown마다 시험 요청 하나로 복구 확인. 연결 맺기는 짧은 제한 시간으로 따로 끊음.
+# - 연결 점검(HealthProbe)은 백그라운드에서 돌고 화면은 마지막 결과(지연 포함)만 읽음.
+# - Streamlit에 의존하지 않음: 경고/안내 메시지는 콜백(on_error/on_retry)으로 넘겨받음.
+
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import get_metrics
+from tmdb_cache import DiskCache, cache_key, endpoint_family, get_disk_cache
+
+logger = logging.getLogger(__name__)
+
+# TMDB 기본값 (TMDB_BASE_URL로 다른 서버를 가리킬 수 있음)
+TMDB_BASE = os.getenv("TMDB_BASE_URL", "https://api.themoviedb.org/3").rstrip("/")
+USER_AGENT = "tmdb-client/1.0 (+streamlit)"
+
+# 커넥션 풀 크기: 병렬 워커 수보다 작으면 연결을 버리고 새로 맺게 되므로 넉넉히
+POOL_CONNECTIONS = int(os.getenv("TMDB_POOL_CONNECTIONS", "4"))
+POOL_MAXSIZE = int(os.getenv("TMDB_POOL_MAXSIZE", "32"))
+
+# 초당 요청 수/버스트 (TMDB_RATE_LIMIT_RPS=0이면 제한 끔)
+RATE_LIMIT_RPS = float(os.getenv("TMDB_RATE_LIMIT_RPS", "40"))
+RATE_LIMIT_BURST = int(os.getenv("TMDB_RATE_LIMIT_BURST", "20"))
+
+RETRY_STATUS = (429, 500, 502, 503, 504)
+# 재시도 대기 상한(초): Retry-After가 너무 길어도 이 이상은 기다리지 않음
+MAX_BACKOFF_SEC = 30.0
+
+# 연결 맺기 제한 시간(초): 응답 대기(timeout)와 따로 짧게 → 죽은 서버에 워커 스레드가 묶이지 않음
+CONNECT_TIMEOUT_SEC = float(os.getenv("TMDB_CONNECT_TIMEOUT_SEC", "3.05"))
+
+# 회로 차단기: 같은 엔드포인트 종류에서 연속 실패가 이 횟수가 되면 열림 (0이면 끔)
+BREAKER_FAILURES = int(os.getenv("TMDB_BREAKER_FAILURES", "5"))
+# 열린 뒤 시험 요청(half-open)을 보내기까지 기다리는 시간(초)
+BREAKER_COOLDOWN_SEC = float(os.getenv("TMDB_BREAKER_COOLDOWN_SEC", "30"))
+
+# 연결 점검 주기(초)와 점검 요청 제한 시간(초)
+HEALTH_CHECK_INTERVAL_SEC = float(os.getenv("TMDB_HEALTH_INTERVAL_SEC", "60"))
+HEALTH_CHECK_TIMEOUT_SEC = float(os.getenv("TMDB_HEALTH_TIMEOUT_SEC", "5"))
+
+Notifier = Callable[[str], None]
+
+
+def _log_warning(message: str) -> None:
+    logger.warning(message)
+
+
+def _is_json_response(r: requests.Response) -> bool:
+    ct = (r.headers.get("content-type") or "").lower()
+    return "application/json" in ct
+
+
+def _retry_after_seconds(r: requests.Response) -> Optional[float]:
+    """Retry-After 헤더(초 또는 HTTP 날짜)를 초 단위로 변환."""
+    value = (r.headers.get("Retry-After") or "").strip()
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """스레드 안전 토큰 버킷. 초당 rate개씩 채워지고 최대 burst개까지 모아둠."""
+
+    def __init__(self, rate: float = RATE_LIMIT_RPS, burst: int = RATE_LIMIT_BURST):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """토큰 1개를 가져올 때까지 대기하고, 기다린 시간(초)을 반환."""
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class SingleFlight:
+    """같은 키의 동시 호출을 하나로 합침: 먼저 온 호출만 실행하고 나머지는 결과를 기다려 공유."""
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result: Any = None
+            self.error: Optional[BaseException] = None
+
+    def __init__(self):
+        self._calls: Dict[str, "SingleFlight._Call"] = {}
+        self._lock = threading.Lock()
+        self.collapsed = 0
+
+    def do(self, key: str, fn: Callable[[], Any], family: str = "") -> Any:
+        """family는 지표 라벨 (합쳐진 호출 수를 엔드포인트 종류별로 내보냄)."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = SingleFlight._Call()
+            else:
+                self.collapsed += 1
+        if not leader:
+            get_metrics().inc("tmdb_collapsed_total", family=family)
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+class CircuitBreaker:
+    """연속 실패가 failure_threshold번 쌓이면 열려서(open) 요청을 막음.
+    cooldown이 지나면 시험 요청 하나만 통과시키고(half_open) 성공하면 닫히고, 실패하면 다시 열림."""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name: str = "", failure_threshold: int = BREAKER_FAILURES, cooldown: float = BREAKER_COOLDOWN_SEC):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def allow(self) -> bool:
+        """요청을 보내도 되는지. half_open이면 시험 요청 하나에만 True."""
+        if self.failure_threshold <= 0:
+            return True
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                self._transition(self.HALF_OPEN)
+            if self._state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._probing = False
+            if self._state != self.CLOSED:
+                self._transition(self.CLOSED)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._state == self.HALF_OPEN or (self._state == self.CLOSED and self._failures >= self.failure_threshold > 0):
+                self._opened_at = time.monotonic()
+                self._transition(self.OPEN)
+
+    def _transition(self, state: str) -> None:
+        self._state = state
+        get_metrics().inc("tmdb_circuit_transitions_total", family=self.name, state=state)
+        if state == self.OPEN:
+            logger.warning("TMDB 회로 열림 (%s): 연속 실패 %d회, %.0f초 뒤 재시도", self.name, self._failures, self.cooldown)
+        elif state == self.CLOSED:
+            logger.info("TMDB 회로 닫힘 (%s)", self.name)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            retry_in = max(0.0, self.cooldown - (time.monotonic() - self._opened_at)) if self._state == self.OPEN else 0.0
+            return {"state": self._state, "failures": self._failures, "retry_in": round(retry_in, 1)}
+
+
+def build_headers(access_token: str = "") -> Dict[str, str]:
+    """요청별 헤더. v4 토큰이 있으면 Bearer 인증."""
+    headers: Dict[str, str] = {}
+    if access_token:
+        headers["Authorization"] = f"Bearer {access_token}"
+    return headers
+
+
+def attach_auth_params(params: Dict[str, Any], api_key: str = "", access_token: str = "") -> Dict[str, Any]:
+    """v4 토큰이 없을 때만 쿼리에 v3 api_key를 붙임."""
+    if access_token:
+        return params  # v4 사용 시 api_key 추가 금지
+    if api_key:
+        p = params.copy()
+        p["api_key"] = api_key
+        return p
+    return params
+
+
+class TMDBClient:
+    """커넥션 풀을 공유하는 TMDB 클라이언트.
+
+    requests.Session의 커넥션 풀(urllib3)은 스레드 안전하고, 이 클라이언트는 세션에
+    요청별 상태를 저장하지 않으므로(인증은 요청마다 헤더/파라미터로 전달) 병렬 워커에서
+    같은 인스턴스를 그대로 써도 됨.
+    """
+
+    def __init__(
+        self,
+        base_url: str = TMDB_BASE,
+        pool_connections: int = POOL_CONNECTIONS,
+        pool_maxsize: int = POOL_MAXSIZE,
+        timeout: float = 15,
+        retries: int = 2,
+        backoff_sec: float = 0.6,
+        cache: Optional[DiskCache] = None,
+        limiter: Optional[TokenBucket] = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.cache = cache
+        self.limiter = limiter or TokenBucket()
+        self.flights = SingleFlight()
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_sec = backoff_sec
+
+        # 카운터: 보낸 요청 / 로컬 제한으로 대기 / 서버 429 / 재시도 / 옛 캐시로 먼저 응답
+        self._stats = {"requests": 0, "rate_limited": 0, "throttled": 0, "retried": 0, "stale_served": 0, "short_circuited": 0}
+        self._stats_lock = threading.Lock()
+        self._revalidating: Set[str] = set()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "accept": "application/json",
+            "Accept-Encoding": "gzip, deflate",
+            "Connection": "keep-alive",
+            "User-Agent": USER_AGENT,
+        })
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["collapsed"] = self.flights.collapsed
+        return stats
+
+    def breaker(self, family: str) -> CircuitBreaker:
+        """엔드포인트 종류별 회로 차단기 (모든 세션/스레드가 공유)."""
+        with self._stats_lock:
+            b = self._breakers.get(family)
+            if b is None:
+                b = self._breakers[family] = CircuitBreaker(family)
+            return b
+
+    def circuits(self) -> Dict[str, Dict[str, Any]]:
+        """{종류: {state, failures, retry_in}}"""
+        with self._stats_lock:
+            breakers = dict(self._breakers)
+        return {family: b.snapshot() for family, b in sorted(breakers.items())}
+
+    def open_circuits(self) -> List[str]:
+        """닫혀 있지 않은(요청을 막는 중인) 엔드포인트 종류."""
+        return [family for family, c in self.circuits().items() if c["state"] != CircuitBreaker.CLOSED]
+
+    def _backoff(self, attempt: int, r: Optional[requests.Response] = None) -> float:
+        """Retry-After가 있으면 그대로, 없으면 지터를 섞은 지수 백오프."""
+        retry_after = _retry_after_seconds(r) if r is not None else None
+        if retry_after is not None:
+            return min(MAX_BACKOFF_SEC, retry_after)
+        return random.uniform(0, min(MAX_BACKOFF_SEC, self.backoff_sec * (2 ** attempt)))
+
+    def request(
+        self,
+        endpoint: str,
+        params: Optional[dict] = None,
+        *,
+        api_key: str = "",
+        access_token: str = "",
+        lang: Optional[str] = None,
+        timeout: Optional[float] = None,
+        retries: Optional[int] = None,
+        use_cache: bool = True,
+        on_error: Notifier = _log_warning,
+        on_retry: Optional[Notifier] = None,
+        on_send: Optional[Callable[[], None]] = None,
+    ) -> dict:
+        """
+        TMDB API 호출(안전판).
+        - v4 토큰 있으면 헤더 인증, 없으면 v3 쿼리 인증
+        - 항상 text로 받은 후 JSON 여부 확인 후 파싱
+        - JSON 아님/빈 응답/오류면 {} 반환 (메시지는 on_error로 전달)
+        - 429/5xx, 네트워크 오류 재시도 (Retry-After 우선, 없으면 지수 백오프 + 지터)
+        - 보내기 전 공용 토큰 버킷에서 토큰을 받아 초당 요청 수 제한
+        - 디스크 캐시: 신선하면 네트워크 없이 반환, 오래됐으면 조건부 요청(304면 캐시 사용)
+          (엔드포인트 정책상 옛 값을 먼저 줘도 되는 기간이면 바로 반환하고 재검증은 백그라운드로)
+        - 같은 요청(엔드포인트+파라미터+인증)이 진행 중이면 새로 보내지 않고 그 결과를 공유
+          (공유된 dict는 여러 호출자가 같이 보므로 수정하지 말 것)
+        - 엔드포인트 종류의 회로가 열려 있으면 보내지 않고 캐시(기간이 지났어도)나 {}를 바로 반환
+        - on_send는 이 호출이 실제로 네트워크 요청을 보낼 때마다 불림 (캐시/회로 차단으로 끝나면 안 불림)
+        """
+        url = f"{self.base_url}/{endpoint.lstrip('/')}"
+        params = (params or {}).copy()
+        if "language" not in params and lang:
+            params["language"] = lang
+
+        headers = build_headers(access_token)
+        params = attach_auth_params(params, api_key, access_token)
+        timeout = self.timeout if timeout is None else timeout
+        retries = self.retries if retries is None else retries
+
+        flight_key = f"{_auth_hash(api_key, access_token)}:{cache_key(endpoint, params)}"
+        family = endpoint_family(cache_key(endpoint, params))
+
+        def revalidate() -> None:
+            # 백그라운드 재검증: 화면 알림 없이 로그만
+            self._revalidate_async(
+                flight_key,
+                lambda: self._fetch(endpoint, url, params, dict(headers), timeout, retries, use_cache, _log_warning, None),
+                family,
+            )
+
+        return self.flights.do(
+            flight_key,
+            lambda: self._fetch(endpoint, url, params, headers, timeout, retries, use_cache, on_error, on_retry, revalidate, on_send),
+            family,
+        )
+
+    def _revalidate_async(self, flight_key: str, fetch: Callable[[], dict], family: str = "") -> None:
+        with self._stats_lock:
+            if flight_key in self._revalidating:
+                return
+            self._revalidating.add(flight_key)
+
+        def run() -> None:
+            try:
+                # 앞선 요청의 flight(옛 값 반환)에 합쳐지지 않도록 별도 키
+                self.flights.do(f"{flight_key}#revalidate", fetch, family)
+            finally:
+                with self._stats_lock:
+                    self._revalidating.discard(flight_key)
+
+        threading.Thread(target=run, name="tmdb-revalidate", daemon=True).start()
+
+    def _fetch(
+        self,
+        endpoint: str,
+        url: str,
+        params: Dict[str, Any],
+        headers: Dict[str, str],
+        timeout: float,
+        retries: int,
+        use_cache: bool,
+        on_error: Notifier,
+        on_retry: Optional[Notifier],
+        revalidate: Optional[Callable[[], None]] = None,
+        on_send: Optional[Callable[[], None]] = None,
+    ) -> dict:
+        metrics = get_metrics()
+        family = endpoint_family(cache_key(endpoint, params))
+        cache = self.cache if use_cache else None
+        key = cache_key(endpoint, params) if cache else ""
+        cached = cache.get(key) if cache else None
+        if cache and cached is None:
+            metrics.inc("cache_lookups_total", cache="disk", family=family, result="miss")
+        breaker = self.breaker(family)
+        if cached is not None:
+            fresh = cache.is_fresh(cached, key)
+            if fresh or (revalidate is not None and cache.is_servable_stale(cached, key)):
+                try:
+                    data = json.loads(cached.body)
+                except ValueError:
+                    cached = None
+                else:
+                    metrics.inc("cache_lookups_total", cache="disk", family=family, result="hit" if fresh else "stale")
+                    if not fresh:
+                        self._count("stale_served")
+                        metrics.inc("tmdb_stale_served_total", family=family)
+                        revalidate()
+                    return data
+            if cached is not None:
+                metrics.inc("cache_lookups_total", cache="disk", family=family, result="revalidate")
+            if cached is not None and cached.etag:
+                headers["If-None-Match"] = cached.etag
+            elif cached is not None and cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+
+        for attempt in range(retries + 1):
+            # 재시도 사이에 회로가 열렸으면(다른 요청들의 실패 포함) 더 기다리지 않고 바로 대체 응답
+            if not breaker.allow():
+                return self._short_circuit(family, cached)
+            try:
+                if self.limiter.acquire() > 0:
+                    self._count("rate_limited")
+                    metrics.inc("tmdb_rate_limited_total", family=family)
+                self._count("requests")
+                if on_send:
+                    on_send()
+                started = time.perf_counter()
+                try:
+                    r = self.session.get(url, headers=headers, params=params, timeout=(min(CONNECT_TIMEOUT_SEC, timeout), timeout))
+                finally:
+                    metrics.observe("tmdb_request_seconds", time.perf_counter() - started, family=family)
+                metrics.inc("tmdb_requests_total", family=family, status=f"{r.status_code // 100}xx")
+                # 5xx만 장애로 셈 (429·4xx는 서버가 살아 있다는 뜻)
+                if r.status_code >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                if r.status_code == 304 and cached is not None:
+                    cache.touch(key)
+                    return json.loads(cached.body)
+                raw = r.text or ""
+
+                if r.status_code == 429:
+                    self._count("throttled")
+                    metrics.inc("tmdb_throttled_total", family=family)
+                if r.status_code in RETRY_STATUS:
+                    if attempt < retries:
+                        if on_retry:
+                            on_retry(f"TMDB {r.status_code} 재시도 중... ({attempt+1}/{retries})")
+                        self._count("retried")
+                        metrics.inc("tmdb_retries_total", family=family)
+                        time.sleep(self._backoff(attempt, r))
+                        continue
+
+                if not r.ok:
+                    metrics.inc("tmdb_errors_total", family=family, reason=f"http_{r.status_code}")
+                    if r.status_code == 401:
+                        on_error("TMDb 인증 실패(401). 키/토큰을 확인해줘.")
+                    else:
+                        on_error(f"TMDB {r.status_code} {r.reason} @ {endpoint} → {raw[:200]}")
+                    return {}
+
+                if not raw.strip():
+                    return {}
+
+                if not _is_json_response(r):
+                    metrics.inc("tmdb_errors_total", family=family, reason="not_json")
+                    on_error(f"JSON 아님 @ {endpoint} → {raw[:120]}")
+                    return {}
+
+                try:
+                    data = r.json()
+                    if cache:
+                        cache.put(key, raw, r.headers.get("ETag", ""), r.headers.get("Last-Modified", ""))
+                    return data
+                except ValueError:
+                    metrics.inc("tmdb_errors_total", family=family, reason="invalid_json")
+                    on_error(f"JSON 파싱 실패 @ {endpoint} → {raw[:120]}")
+                    return {}
+
+            except requests.exceptions.RequestException as e:
+                breaker.record_failure()
+                metrics.inc("tmdb_requests_total", family=family, status="network_error")
+                if attempt < retries:
+                    self._count("retried")
+                    metrics.inc("tmdb_retries_total", family=family)
+                    time.sleep(self._backoff(attempt))
+                    continue
+                metrics.inc("tmdb_errors_total", family=family, reason="network")
+                on_error(f"TMDB 요청 오류 @ {endpoint} → {e}")
+                return {}
+
+        return {}
+
+    def _short_circuit(self, family: str, cached: Optional[Any]) -> dict:
+        """회로가 열려 보내지 않은 요청: 디스크 캐시에 있으면 기간이 지났어도 그 값, 없으면 {}.
+        호출마다 경고를 띄우지 않음 (화면은 open_circuits()로 한 번만 안내)."""
+        self._count("short_circuited")
+        get_metrics().inc("tmdb_short_circuits_total", family=family, fallback="cache" if cached is not None else "empty")
+        if cached is not None:
+            try:
+                return json.loads(cached.body)
+            except ValueError:
+                pass
+        return {}
+
+
+def _auth_hash(api_key: str, access_token: str) -> str:
+    return hashlib.sha1(f"{api_key}|{access_token}".encode("utf-8")).hexdigest()[:12]
+
+
+class HealthStatus(NamedTuple):
+    ok: bool
+    latency_ms: Optional[float]  # 회로가 열려 요청을 안 보냈으면 None
+    items: Optional[int]         # 응답 목록 길이 (목록이 아니면 None)
+    circuit: str                 # 점검 엔드포인트 종류의 회로 상태
+    detail: str
+    checked_at: float
+
+
+class HealthProbe:
+    """TMDB 연결 점검을 백그라운드 스레드로 돌리고 마지막 결과만 돌려줌 (호출자는 절대 기다리지 않음).
+    인증(키/토큰)마다 interval에 한 번만 요청하고, 진행 중인 점검이 있으면 새로 띄우지 않음."""
+
+    def __init__(self, client: TMDBClient, endpoint: str = "configuration/countries",
+                 interval: float = HEALTH_CHECK_INTERVAL_SEC, timeout: float = HEALTH_CHECK_TIMEOUT_SEC):
+        self.client = client
+        self.endpoint = endpoint
+        self.interval = interval
+        self.timeout = timeout
+        self._results: Dict[str, HealthStatus] = {}
+        self._running: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def status(self, api_key: str = "", access_token: str = "", force: bool = False) -> Optional[HealthStatus]:
+        """마지막 점검 결과 (아직 없으면 None). 주기가 지났거나 force면 백그라운드 점검을 시작."""
+        auth = _auth_hash(api_key, access_token)
+        with self._lock:
+            last = self._results.get(auth)
+            due = force or last is None or time.time() - last.checked_at >= self.interval
+            start = due and auth not in self._running
+            if start:
+                self._running.add(auth)
+        if start:
+            threading.Thread(target=self._run, args=(auth, api_key, access_token), name="tmdb-health", daemon=True).start()
+        return last
+
+    def _run(self, auth: str, api_key: str, access_token: str) -> None:
+        try:
+            result = self.check(api_key, access_token)
+            with self._lock:
+                self._results[auth] = result
+        finally:
+            with self._lock:
+                self._running.discard(auth)
+
+    def check(self, api_key: str = "", access_token: str = "") -> HealthStatus:
+        """점검 요청 한 번 (재시도 없음, 캐시 안 씀, 짧은 제한 시간). 회로가 열려 있으면 요청하지 않음."""
+        errors: List[str] = []
+        # 다른 요청과 섞이는 프로세스 전체 요청 수 대신, 이 호출이 실제로 보냈는지를 직접 기록
+        sends: List[bool] = []
+        started = time.perf_counter()
+        data = self.client.request(
+            self.endpoint, {"language": "en-US"}, api_key=api_key, access_token=access_token,
+            timeout=self.timeout, retries=0, use_cache=False, on_error=errors.append,
+            on_send=lambda: sends.append(True),
+        )
+        latency = round((time.perf_counter() - started) * 1000, 1)
+        circuit = self.client.breaker(endpoint_family(self.endpoint)).state
+        sent = bool(sends)
+        if data:
+            detail = "OK"
+        elif errors:
+            detail = errors[-1]
+        elif circuit != CircuitBreaker.CLOSED and not sent:
+            detail = "회로 열림: 장애가 이어져 잠시 요청을 보내지 않음"
+        else:
+            detail = "빈 응답"
+        return HealthStatus(
+            ok=bool(data),
+            latency_ms=latency if sent else None,
+            items=len(data) if isinstance(data, list) else None,
+            circuit=circuit,
+            detail=detail,
+            checked_at=time.time(),
+        )
+
+
+# -------------------------------------
+# 프로세스 공용 인스턴스
+# -------------------------------------
+
+_client: Optional[TMDBClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> TMDBClient:
+    """프로세스 전체에서 하나만 만들어 공유하는 클라이언트."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = TMDBClient(cache=get_disk_cache())
+    return _client
+
+
+_health_probe: Optional[HealthProbe] = None
+_health_probe_lock = threading.Lock()
+
+
+def get_health_probe() -> HealthProbe:
+    """공용 클라이언트로 점검하는 프로세스 공용 연결 점검기."""
+    global _health_probe
+    if _health_probe is None:
+        with _health_probe_lock:
+            if _health_probe is None:
+                _health_probe = HealthProbe(get_client())
+    return _health_probe